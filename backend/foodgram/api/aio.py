@@ -0,0 +1,89 @@
+"""Асинхронные представления поверх синхронного кода API.
+
+В Django 3.2 нет асинхронного ORM, а синхронные представления под ASGI
+выполняются в одном общем потоке, так что один медленный запрос держит
+все остальные. Представления с AsyncViewMixin целиком уходят в пул
+потоков со своими соединениями к базе, а независимые выборки внутри
+запроса идут параллельно через asyncio.gather.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from functools import update_wrapper, wraps
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connection
+
+view_executor = ThreadPoolExecutor(
+    settings.ASYNC_VIEW_THREADS, thread_name_prefix="api-view"
+)
+lookup_executor = ThreadPoolExecutor(
+    settings.ASYNC_LOOKUP_THREADS, thread_name_prefix="api-lookup"
+)
+running_async = ContextVar("running_async", default=False)
+
+
+def in_thread(func, executor):
+    """sync_to_async в заданном пуле.
+
+    Соединение потока переиспользуется между вызовами и закрывается,
+    только когда оно старше CONN_MAX_AGE или сломано.
+    """
+    @wraps(func)
+    def call(*args, **kwargs):
+        close_old_connections()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            close_old_connections()
+    return sync_to_async(call, thread_sensitive=False, executor=executor)
+
+
+async def gather(funcs):
+    token = running_async.set(False)
+    try:
+        return await asyncio.gather(
+            *(in_thread(func, lookup_executor)() for func in funcs)
+        )
+    finally:
+        running_async.reset(token)
+
+
+def concurrently(*funcs):
+    """Результаты независимых вызовов funcs без аргументов.
+
+    Внутри асинхронного представления вызовы идут параллельно в пуле
+    lookup_executor, иначе и внутри транзакции — по очереди. Вложенные
+    вызовы concurrently выполняются по очереди.
+    """
+    if (
+        len(funcs) < 2
+        or not running_async.get()
+        or connection.in_atomic_block
+    ):
+        return [func() for func in funcs]
+    return async_to_sync(gather)(funcs)
+
+
+class AsyncViewMixin:
+    """Под ASYNC_VIEWS представление становится корутиной.
+
+    Обработка запроса целиком, вместе с аутентификацией и пагинацией DRF,
+    выполняется в пуле view_executor и не занимает общий поток Django.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        if not settings.ASYNC_VIEWS:
+            return view
+        run = in_thread(view, view_executor)
+
+        async def async_view(request, *args, **kwargs):
+            token = running_async.set(True)
+            try:
+                return await run(request, *args, **kwargs)
+            finally:
+                running_async.reset(token)
+        return update_wrapper(async_view, view)
@@ -0,0 +1,83 @@
+import threading
+from bisect import bisect_left
+
+from django.db.models import Case, IntegerField, Value, When
+
+from recipes.models import Ingredient
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+
+def rank_by_prefix(queryset, value):
+    """Совпадения с начала названия идут раньше совпадений в середине."""
+    return (
+        queryset.filter(name__icontains=value)
+        .annotate(
+            prefix_rank=Case(
+                When(name__istartswith=value, then=Value(0)),
+                default=Value(1),
+                output_field=IntegerField(),
+            )
+        )
+        .order_by("prefix_rank", "name")
+    )
+
+
+class IngredientIndex:
+    """Отсортированный в памяти справочник ингредиентов для автодополнения.
+
+    Загружается при первом обращении и сбрасывается сигналами
+    сохранения и удаления Ingredient.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _load(self):
+        rows = sorted(
+            (name.lower(), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        )
+        return [row[0] for row in rows], rows
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                snapshot = self._snapshot
+                if snapshot is None:
+                    snapshot = self._snapshot = self._load()
+        return snapshot
+
+    def search(self, value, limit=DEFAULT_LIMIT):
+        keys, rows = self._get_snapshot()
+        value = value.lower()
+        found = []
+        position = bisect_left(keys, value)
+        while (
+            position < len(keys)
+            and keys[position].startswith(value)
+            and len(found) < limit
+        ):
+            found.append(rows[position])
+            position += 1
+        if len(found) < limit:
+            for row in rows:
+                if value in row[0] and not row[0].startswith(value):
+                    found.append(row)
+                    if len(found) == limit:
+                        break
+        return [
+            {"id": pk, "name": name, "measurement_unit": measurement_unit}
+            for _, pk, name, measurement_unit in found
+        ]
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,133 @@
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import CharField, Value
+
+from recipes.models import Favourite, ShoppingCart, Subscription
+
+from .aio import concurrently
+from .representations import recipe_representations
+from .versions import new_version
+
+VERSION_KEY = "recipes:version"
+USER_SETS = {
+    "favourites": (Favourite, "recipe_id"),
+    "carts": (ShoppingCart, "recipe_id"),
+    "subscriptions": (Subscription, "author_id"),
+}
+
+
+def get_version():
+    return cache.get_or_set(VERSION_KEY, new_version, None)
+
+
+def bump_version():
+    """Сбрасывает все закэшированные рецепты разом."""
+    cache.set(VERSION_KEY, new_version(), None)
+
+
+def recipe_key(pk, version):
+    return f"recipe:{version}:{pk}"
+
+
+def user_key(user_id, name):
+    return f"user:{user_id}:{name}"
+
+
+def stamp_key(pk):
+    return f"recipe:{pk}:stamp"
+
+
+def get_recipe_stamp(pk):
+    """Отметка рецепта для ETag, меняется при каждой инвалидации."""
+    return cache.get_or_set(stamp_key(pk), new_version, None)
+
+
+def invalidate_recipes(*pks):
+    version = get_version()
+    cache.delete_many(
+        [recipe_key(pk, version) for pk in pks]
+        + [stamp_key(pk) for pk in pks]
+    )
+
+
+def invalidate_user(user_id, name):
+    cache.delete(user_key(user_id, name))
+
+
+def get_user_sets(user):
+    """Id избранного, корзины и авторов в подписках пользователя."""
+    if not user.is_authenticated:
+        return {name: frozenset() for name in USER_SETS}
+    keys = {name: user_key(user.pk, name) for name in USER_SETS}
+    cached = cache.get_many(keys.values())
+    missing = [name for name in USER_SETS if keys[name] not in cached]
+    if missing:
+        loaded = load_user_sets(user, missing)
+        cache.set_many(
+            {keys[name]: loaded[name] for name in missing},
+            settings.RECIPE_CACHE_TIMEOUT,
+        )
+        cached.update((keys[name], loaded[name]) for name in missing)
+    return {name: cached[keys[name]] for name in USER_SETS}
+
+
+def load_user_sets(user, names):
+    """Множества names пользователя одним запросом UNION ALL."""
+    querysets = [
+        model.objects.filter(user=user)
+        .annotate(kind=Value(name, output_field=CharField()))
+        .values_list(field, "kind")
+        .order_by()
+        for name in names
+        for model, field in [USER_SETS[name]]
+    ]
+    loaded = {name: set() for name in names}
+    for pk, name in querysets[0].union(*querysets[1:], all=True):
+        loaded[name].add(pk)
+    return {name: frozenset(ids) for name, ids in loaded.items()}
+
+
+def overlay(data, user_sets):
+    data = dict(data)
+    data["is_favorited"] = data["id"] in user_sets["favourites"]
+    data["is_in_shopping_cart"] = data["id"] in user_sets["carts"]
+    data["author"] = dict(data["author"])
+    data["author"]["is_subscribed"] = (
+        data["author"]["id"] in user_sets["subscriptions"]
+    )
+    return data
+
+
+def get_recipes_shared(keys):
+    """Общие представления рецептов по ключам {pk: ключ кэша}."""
+    cached = cache.get_many(keys.values())
+    missing = [pk for pk, key in keys.items() if key not in cached]
+    if missing:
+        fresh = {
+            keys[item["id"]]: item
+            for item in recipe_representations(missing)
+        }
+        cache.set_many(fresh, settings.RECIPE_CACHE_TIMEOUT)
+        cached.update(fresh)
+    return cached
+
+
+def get_recipes_data(pks, request):
+    """Представления рецептов в порядке pks.
+
+    Общая для всех часть берётся из кэша по id рецепта, флаги текущего
+    пользователя накладываются поверх; в асинхронном представлении обе
+    части загружаются параллельно.
+    """
+    version = get_version()
+    keys = {pk: recipe_key(pk, version) for pk in pks}
+    cached, user_sets = concurrently(
+        partial(get_recipes_shared, keys),
+        partial(get_user_sets, request.user),
+    )
+    return [
+        overlay(cached[keys[pk]], user_sets)
+        for pk in pks if keys[pk] in cached
+    ]
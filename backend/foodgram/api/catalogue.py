@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.db import DatabaseError
+
+from recipes.models import Ingredient, Tag
+
+from .versions import table_versions
+
+logger = logging.getLogger(__name__)
+
+# Как часто сверять версию справочников, секунд.
+CHECK_INTERVAL = 1.0
+
+Snapshot = namedtuple(
+    "Snapshot", ("version", "tags", "tag_slugs", "ingredients")
+)
+
+
+class Catalogue:
+    """Теги и ингредиенты в памяти процесса.
+
+    Снимок неизменяемый: id -> кортеж полей и slug -> id. Перечитывается
+    целиком, когда меняется версия таблиц Tag и Ingredient в базе;
+    версия сверяется не чаще раза в CHECK_INTERVAL секунд, изменения
+    в своём процессе сбрасывают снимок сигналами сразу. id, которого
+    нет в снимке, перед отказом проверяется запросом к базе.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._checked_at = 0
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _version(self):
+        return table_versions(Tag, Ingredient)
+
+    def _load(self, version):
+        tags = {
+            pk: (name, color, slug)
+            for pk, name, color, slug in Tag.objects.values_list(
+                "id", "name", "color", "slug"
+            )
+        }
+        ingredients = {
+            pk: (name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                "id", "name", "measurement_unit"
+            )
+        }
+        return Snapshot(
+            version,
+            MappingProxyType(tags),
+            MappingProxyType({row[2]: pk for pk, row in tags.items()}),
+            MappingProxyType(ingredients),
+        )
+
+    def get(self):
+        snapshot = self._snapshot
+        now = time.monotonic()
+        if snapshot is not None and now - self._checked_at < CHECK_INTERVAL:
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            version = self._version()
+            if snapshot is None or snapshot.version != version:
+                snapshot = self._snapshot = self._load(version)
+            self._checked_at = now
+        return snapshot
+
+    def warm(self):
+        """Загружает снимок при старте процесса."""
+        try:
+            self.get()
+        except DatabaseError as error:
+            logger.warning("Не удалось загрузить справочники: %s", error)
+
+    def _reload(self):
+        """Перечитывает снимок, не дожидаясь смены версии."""
+        with self._lock:
+            self._snapshot = self._load(self._version())
+            self._checked_at = time.monotonic()
+
+    def has_tag(self, pk):
+        if pk in self.get().tags:
+            return True
+        if not Tag.objects.filter(pk=pk).exists():
+            return False
+        self._reload()
+        return True
+
+    def tag_ids(self, slugs):
+        tag_slugs = self.get().tag_slugs
+        return [tag_slugs[slug] for slug in slugs if slug in tag_slugs]
+
+    def tag_choices(self):
+        return [(slug, slug) for slug in self.get().tag_slugs]
+
+    def missing_ingredients(self, pks):
+        ingredients = self.get().ingredients
+        missing = {pk for pk in pks if pk not in ingredients}
+        if not missing:
+            return missing
+        found = set(
+            Ingredient.objects.filter(pk__in=missing)
+            .values_list("pk", flat=True)
+        )
+        if found:
+            self._reload()
+        return missing - found
+
+
+catalogue = Catalogue()
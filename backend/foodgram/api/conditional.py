@@ -0,0 +1,78 @@
+import gzip
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.views.decorators.http import condition
+
+from .cache import get_recipe_stamp, get_user_sets, get_version
+from .versions import table_version
+
+COMPRESS_LEVEL = 6
+
+
+def fingerprint(*parts):
+    return hashlib.md5("|".join(map(str, parts)).encode()).hexdigest()
+
+
+def table_etag(model):
+    """ETag ответа, зависящего только от таблицы model и адреса."""
+    def etag(request, *args, **kwargs):
+        return fingerprint(
+            table_version(model),
+            request.accepted_media_type,
+            request.get_full_path(),
+        )
+    return etag
+
+
+def recipe_etag(request, pk, *args, **kwargs):
+    """ETag рецепта: его отметка в кэше и флаги текущего пользователя."""
+    user_sets = get_user_sets(request.user)
+    return fingerprint(
+        get_version(),
+        get_recipe_stamp(pk),
+        request.accepted_media_type,
+        pk in user_sets["favourites"],
+        pk in user_sets["carts"],
+        hash(user_sets["subscriptions"]),
+    )
+
+
+def conditional_get(etag_func, max_age=0, per_user=False):
+    """condition() с Cache-Control, в том числе у ответа 304.
+
+    Общие для всех ответы публичные и живут max_age секунд. Ответы
+    per_user авторизованному пользователю приватные и всегда
+    перепроверяются по ETag.
+    """
+    def decorator(view):
+        conditional = condition(etag_func=etag_func)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional(request, *args, **kwargs)
+            if per_user and request.user.is_authenticated:
+                patch_cache_control(response, private=True, no_cache=True)
+            else:
+                patch_cache_control(response, public=True, max_age=max_age)
+            if per_user:
+                patch_vary_headers(response, ("Authorization",))
+            return response
+        return wrapper
+    return decorator
+
+
+def compressed_body(key, render):
+    """Готовое тело ответа и его gzip-версия из кэша.
+
+    render() вызывается, только если в кэше для key ничего нет.
+    """
+    cached = cache.get(key)
+    if cached is None:
+        body = render()
+        cached = (body, gzip.compress(body, COMPRESS_LEVEL))
+        cache.set(key, cached, settings.RECIPE_CACHE_TIMEOUT)
+    return cached
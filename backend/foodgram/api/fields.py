@@ -0,0 +1,64 @@
+import base64
+import binascii
+
+from django.core.files.uploadedfile import UploadedFile
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+
+from recipes.images import CHUNK_SIZE, inspect_image, spool_upload
+
+from .catalogue import catalogue
+
+
+def decode_base64(data, start=0):
+    """Декодирует base64-строку кусками, не создавая копию целиком."""
+    remainder = ""
+    for position in range(start, len(data), CHUNK_SIZE):
+        chunk = data[position:position + CHUNK_SIZE]
+        chunk = remainder + "".join(chunk.split())
+        cut = len(chunk) - len(chunk) % 4
+        remainder = chunk[cut:]
+        yield base64.b64decode(chunk[:cut], validate=True)
+    if remainder:
+        yield base64.b64decode(remainder, validate=True)
+
+
+class LimitedBase64ImageField(Base64ImageField):
+    """Base64-картинка для совместимости со старыми клиентами.
+
+    Строка декодируется по частям во временный файл с ограничением
+    размера, формат и разрешение проверяются по заголовку файла, так что
+    копия картинки в памяти не создаётся. Новые клиенты
+    загружают картинку через /api/recipes/<id>/image/.
+    """
+
+    def to_internal_value(self, data):
+        if data in self.EMPTY_VALUES:
+            return None
+        if not isinstance(data, str):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        start = data.find(";base64,")
+        start = 0 if start == -1 else start + len(";base64,")
+        try:
+            file, digest, size = spool_upload(decode_base64(data, start))
+        except (binascii.Error, ValueError):
+            raise serializers.ValidationError(self.INVALID_FILE_MESSAGE)
+        extension = inspect_image(file)
+        return serializers.FileField.to_internal_value(
+            self, UploadedFile(file, name=f"{digest}.{extension}", size=size)
+        )
+
+
+class CatalogueTagField(serializers.PrimaryKeyRelatedField):
+    """id тега, проверенный по справочнику в памяти, а не запросом."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        if not catalogue.has_tag(pk):
+            self.fail("does_not_exist", pk_value=data)
+        return pk
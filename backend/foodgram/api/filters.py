@@ -4,10 +4,18 @@ from django_filters import rest_framework as filters
 from django_filters.rest_framework import FilterSet
 
 from recipes.models import Ingredient, Recipe, Tag
+from recipes.search import search_recipes
+
+from .autocomplete import rank_by_prefix
+from .catalogue import catalogue
 
 User = get_user_model()
 
 
+def tag_choices():
+    return catalogue.tag_choices()
+
+
 class TagFilter(filters.FilterSet):
     name = django_filters.CharFilter(field_name="name",
                                      lookup_expr="icontains")
@@ -18,19 +26,20 @@ class TagFilter(filters.FilterSet):
 
 
 class IngredientFilter(filters.FilterSet):
-    name = django_filters.CharFilter(field_name="name",
-                                     lookup_expr="icontains")
+    name = django_filters.CharFilter(method="filter_name")
 
     class Meta:
         model = Ingredient
         fields = ["name", "measurement_unit"]
 
+    def filter_name(self, queryset, name, value):
+        return rank_by_prefix(queryset, value)
+
 
 class RecipesFilter(FilterSet):
-    tags = filters.ModelMultipleChoiceFilter(
-        queryset=Tag.objects.all(),
-        field_name="tags__slug",
-        to_field_name="slug",
+    tags = filters.MultipleChoiceFilter(
+        choices=tag_choices,
+        method="filter_tags",
     )
     author = filters.ModelChoiceFilter(
         queryset=User.objects.all(),
@@ -39,10 +48,11 @@ class RecipesFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method="get_is_in_shopping_cart",
     )
+    q = filters.CharFilter(method="search")
 
     class Meta:
         model = Recipe
-        fields = ["is_favorited", "author", "tags", "is_in_shopping_cart"]
+        fields = ["is_favorited", "author", "tags", "is_in_shopping_cart", "q"]
 
     def get_is_favorited(self, queryset, name, value):
         user = self.request.user
@@ -50,6 +60,12 @@ class RecipesFilter(FilterSet):
             return queryset.filter(favorites__user=user)
         return queryset
 
+    def filter_tags(self, queryset, name, value):
+        return queryset.filter(tags__in=catalogue.tag_ids(value)).distinct()
+
+    def search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
         if value and user.is_authenticated:
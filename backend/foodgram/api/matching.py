@@ -0,0 +1,290 @@
+import logging
+import threading
+import time
+from array import array
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import connections
+
+from recipes.models import IngredientsInRecipe
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+LOAD_CHUNK_SIZE = 10000
+# Массив 4-байтовых номеров компактнее битовой маски, пока ингредиент
+# встречается реже чем в одном рецепте из 32.
+DENSE_RATIO = 32
+MAX_SIZE = 255
+
+
+def to_bits(positions, size):
+    buffer = bytearray(size // 8 + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+def popcount(bits):
+    return bin(bits).count("1")
+
+
+def add_to_counter(planes, bits):
+    """Прибавляет единицу к счётчикам рецептов из маски bits.
+
+    planes[i] - маска рецептов, у которых i-й разряд счётчика равен 1.
+    """
+    for level, plane in enumerate(planes):
+        planes[level], bits = plane ^ bits, plane & bits
+        if not bits:
+            return
+    planes.append(bits)
+
+
+def counter_equal_to(planes, value, live):
+    if value >> len(planes):
+        return 0
+    bits = live
+    for level, plane in enumerate(planes):
+        bits &= plane if value >> level & 1 else ~plane
+    return bits
+
+
+class RecipeMatchIndex:
+    """Обратный индекс ингредиент -> рецепты для подбора по продуктам.
+
+    Рецепты нумеруются по возрастанию id. Редкие ингредиенты хранят
+    отсортированный массив номеров, частые - битовую маску, так что
+    совпадения считаются сложением масок, а не перебором рецептов.
+    Изменения из других процессов подтягиваются фоновой перезагрузкой
+    раз в RECIPE_MATCH_INDEX_TTL секунд.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._state = None
+        self._loaded_at = 0
+        self._reloading = False
+        self._dirty = set()
+
+    def _load(self):
+        ids = array("q")
+        positions = {}
+        sizes = bytearray()
+        postings = {}
+        rows = (
+            IngredientsInRecipe.objects.order_by("recipe_id")
+            .values_list("recipe_id", "ingredient_id")
+            .iterator(chunk_size=LOAD_CHUNK_SIZE)
+        )
+        for recipe, ingredient in rows:
+            position = positions.get(recipe)
+            if position is None:
+                position = positions[recipe] = len(ids)
+                ids.append(recipe)
+                sizes.append(0)
+            sizes[position] = min(sizes[position] + 1, MAX_SIZE)
+            if ingredient not in postings:
+                postings[ingredient] = array("i")
+            postings[ingredient].append(position)
+        total = len(ids)
+        bitsets = {
+            ingredient: to_bits(posting, total)
+            for ingredient, posting in postings.items()
+            if len(posting) * DENSE_RATIO > total
+        }
+        for ingredient in bitsets:
+            del postings[ingredient]
+        by_size = {}
+        for position, size in enumerate(sizes):
+            by_size.setdefault(size, []).append(position)
+        return {
+            "ids": ids,
+            "positions": positions,
+            "sizes": sizes,
+            "postings": postings,
+            "bitsets": bitsets,
+            "size_masks": {
+                size: to_bits(members, total)
+                for size, members in by_size.items()
+            },
+            "live": (1 << total) - 1,
+        }
+
+    def _reload(self):
+        with self._load_lock:
+            with self._lock:
+                self._reloading = True
+            try:
+                state = self._load()
+            except Exception:
+                with self._lock:
+                    self._reloading = False
+                raise
+            with self._lock:
+                self._state = state
+                self._loaded_at = time.monotonic()
+                self._reloading = False
+                dirty, self._dirty = self._dirty, set()
+        for recipe in dirty:
+            self.refresh_recipe(recipe)
+
+    def _reload_in_background(self):
+        try:
+            self._reload()
+        except Exception:
+            logger.exception("Не удалось перезагрузить индекс рецептов")
+        finally:
+            connections.close_all()
+
+    def _start_reload(self):
+        with self._lock:
+            if self._reloading:
+                return
+            self._reloading = True
+        threading.Thread(
+            target=self._reload_in_background,
+            name="recipe-match-index",
+            daemon=True,
+        ).start()
+
+    def warm(self):
+        """Загружает индекс в фоне, чтобы первый запрос не ждал."""
+        if self._state is None:
+            self._start_reload()
+
+    def _ensure_loaded(self):
+        if self._state is None:
+            with self._load_lock:
+                loaded = self._state is not None
+            if not loaded:
+                self._reload()
+        elif (
+            time.monotonic() - self._loaded_at
+            > settings.RECIPE_MATCH_INDEX_TTL
+        ):
+            self._start_reload()
+
+    def refresh_recipe(self, recipe_id):
+        """Перечитывает ингредиенты одного рецепта после его изменения."""
+        with self._lock:
+            if self._reloading:
+                self._dirty.add(recipe_id)
+            if self._state is None:
+                return
+        ingredients = set(
+            IngredientsInRecipe.objects.filter(recipe=recipe_id)
+            .values_list("ingredient_id", flat=True)
+        )
+        with self._lock:
+            state = self._state
+            position = state["positions"].get(recipe_id)
+            if position is not None:
+                self._remove(state, position)
+            if not ingredients:
+                return
+            if position is None:
+                position = len(state["ids"])
+                state["positions"][recipe_id] = position
+                state["ids"].append(recipe_id)
+                state["sizes"].append(0)
+            self._add(state, position, ingredients)
+
+    @staticmethod
+    def _remove(state, position):
+        bit = 1 << position
+        for posting in state["postings"].values():
+            index = bisect_left(posting, position)
+            if index < len(posting) and posting[index] == position:
+                del posting[index]
+        bitsets = state["bitsets"]
+        for ingredient, bits in bitsets.items():
+            if bits & bit:
+                bitsets[ingredient] = bits ^ bit
+        size_masks = state["size_masks"]
+        size = state["sizes"][position]
+        if size_masks.get(size, 0) & bit:
+            size_masks[size] ^= bit
+        state["live"] &= ~bit
+
+    @staticmethod
+    def _add(state, position, ingredients):
+        bit = 1 << position
+        postings = state["postings"]
+        for ingredient in ingredients:
+            if ingredient in state["bitsets"]:
+                state["bitsets"][ingredient] |= bit
+                continue
+            if ingredient not in postings:
+                postings[ingredient] = array("i")
+            insort(postings[ingredient], position)
+        size = min(len(ingredients), MAX_SIZE)
+        state["sizes"][position] = size
+        state["size_masks"][size] = state["size_masks"].get(size, 0) | bit
+        state["live"] |= bit
+
+    def match(self, have, limit=DEFAULT_LIMIT, offset=0):
+        """Рецепты по убыванию доли имеющихся ингредиентов.
+
+        Возвращает число рецептов хотя бы с одним совпадением и страницу
+        кортежей (id рецепта, совпало ингредиентов, всего ингредиентов).
+        При равной доле выше рецепт с большим числом совпадений, затем
+        более новый.
+        """
+        self._ensure_loaded()
+        have = set(have)
+        with self._lock:
+            state = self._state
+            total = len(state["ids"])
+            planes = []
+            found = 0
+            for ingredient in have:
+                bits = state["bitsets"].get(ingredient)
+                if bits is None:
+                    posting = state["postings"].get(ingredient, ())
+                    bits = to_bits(posting, total)
+                if bits:
+                    add_to_counter(planes, bits)
+                    found |= bits
+            matched = {}
+            for value in range(1, len(have) + 1):
+                bits = counter_equal_to(planes, value, state["live"])
+                if bits:
+                    matched[value] = bits
+            size_masks = state["size_masks"]
+            buckets = sorted(
+                (
+                    (value, size)
+                    for value in matched
+                    for size in size_masks if size >= value
+                ),
+                key=lambda bucket: (bucket[0] / bucket[1], bucket[0]),
+                reverse=True,
+            )
+            page = []
+            for value, size in buckets:
+                bits = matched[value] & size_masks[size]
+                if not bits:
+                    continue
+                if offset:
+                    count = popcount(bits)
+                    if offset >= count:
+                        offset -= count
+                        continue
+                while bits and len(page) < limit:
+                    position = bits.bit_length() - 1
+                    bits ^= 1 << position
+                    if offset:
+                        offset -= 1
+                        continue
+                    page.append((state["ids"][position], value, size))
+                if len(page) >= limit:
+                    break
+            count = popcount(found & state["live"])
+        return count, page
+
+
+recipe_match_index = RecipeMatchIndex()
@@ -0,0 +1,87 @@
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+METRICS = {
+    "foodgram_request_duration_seconds": (
+        "Время обработки запроса", DURATION_BUCKETS),
+    "foodgram_request_db_seconds": (
+        "Время SQL-запросов за запрос", DURATION_BUCKETS),
+    "foodgram_request_render_seconds": (
+        "Время сериализации ответа в рендерере", DURATION_BUCKETS),
+    "foodgram_request_queries": (
+        "Количество SQL-запросов за запрос", QUERY_BUCKETS),
+    "foodgram_response_size_bytes": (
+        "Размер тела ответа", SIZE_BUCKETS),
+}
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Registry:
+    """Гистограммы по маршрутам в памяти процесса.
+
+    Каждый воркер gunicorn отдаёт свои значения, складывает их Prometheus.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = defaultdict(dict)
+
+    def observe(self, route, method, values):
+        labels = (route, method)
+        with self._lock:
+            for name, value in values.items():
+                histograms = self._histograms[name]
+                if labels not in histograms:
+                    histograms[labels] = Histogram(METRICS[name][1])
+                histograms[labels].observe(value)
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def render(self):
+        """Текстовый формат экспозиции Prometheus 0.0.4."""
+        lines = []
+        with self._lock:
+            for name, (help_text, buckets) in METRICS.items():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} histogram")
+                for (route, method), histogram in sorted(
+                    self._histograms[name].items()
+                ):
+                    labels = f'route="{escape(route)}",method="{method}"'
+                    total = 0
+                    for bound, count in zip(
+                        (*buckets, "+Inf"), histogram.counts
+                    ):
+                        total += count
+                        lines.append(
+                            f'{name}_bucket{{{labels},le="{bound}"}} {total}'
+                        )
+                    lines.append(f"{name}_sum{{{labels}}} {histogram.sum}")
+                    lines.append(f"{name}_count{{{labels}}} {total}")
+        return "\n".join(lines) + "\n"
+
+
+def escape(value):
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
+
+
+registry = Registry()
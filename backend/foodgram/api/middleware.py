@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from .metrics import registry
+
+logger = logging.getLogger("api.requests")
+
+current_tracker = ContextVar("current_tracker", default=None)
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryTracker:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+
+
+def request_tracker(execute, sql, params, many, context):
+    """Обёртка соединения: считает запрос в трекер текущего запроса.
+
+    Трекер берётся из контекста, поэтому учитываются и запросы из потоков,
+    в которые асинхронные представления выносят работу с базой.
+    """
+    tracker = current_tracker.get()
+    if tracker is None:
+        return execute(sql, params, many, context)
+    return tracker(execute, sql, params, many, context)
+
+
+class InstrumentationMiddleware:
+    """Число и время SQL-запросов, время рендера и размер ответа.
+
+    Пишет заголовок Server-Timing, строку в лог api.requests и гистограммы
+    для /api/_metrics. Запросы, которые выполняются при отдаче потокового
+    ответа, сюда не попадают. Ставится последним в MIDDLEWARE, чтобы
+    рендер ответа DRF был измерен отдельно.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        token = current_tracker.set(tracker)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_tracker.reset(token)
+        return self.observe(request, response, tracker, started)
+
+    async def __acall__(self, request):
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        token = current_tracker.set(tracker)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_tracker.reset(token)
+        return self.observe(request, response, tracker, started)
+
+    def observe(self, request, response, tracker, started):
+        total = time.perf_counter() - started
+        render_started = getattr(request, "_render_started", None)
+        render = 0 if render_started is None else (
+            time.perf_counter() - render_started
+        )
+        size = None if response.streaming else len(response.content)
+
+        response["Server-Timing"] = ", ".join((
+            f'db;dur={tracker.duration * 1000:.1f};'
+            f'desc="{tracker.count} queries"',
+            f"render;dur={render * 1000:.1f}",
+            f"total;dur={total * 1000:.1f}",
+        ))
+        match = request.resolver_match
+        if match is None:
+            return response
+        route = match.route
+        logger.info(
+            "%s %s status=%s queries=%d db_ms=%.1f render_ms=%.1f "
+            "total_ms=%.1f size=%s",
+            request.method, route, response.status_code, tracker.count,
+            tracker.duration * 1000, render * 1000, total * 1000, size,
+            extra={
+                "route": route,
+                "method": request.method,
+                "status": response.status_code,
+                "queries": tracker.count,
+                "db_time": tracker.duration,
+                "render_time": render,
+                "total_time": total,
+                "size": size,
+            },
+        )
+        values = {
+            "foodgram_request_duration_seconds": total,
+            "foodgram_request_db_seconds": tracker.duration,
+            "foodgram_request_render_seconds": render,
+            "foodgram_request_queries": tracker.count,
+        }
+        if size is not None:
+            values["foodgram_response_size_bytes"] = size
+        registry.observe(route, request.method, values)
+        self.check_budget(route, request.method, tracker.count)
+        return response
+
+    def process_template_response(self, request, response):
+        request._render_started = time.perf_counter()
+        return response
+
+    def check_budget(self, route, method, count):
+        budget = settings.QUERY_BUDGETS.get(f"{method} {route}")
+        if budget is None:
+            budget = settings.QUERY_BUDGETS.get(route)
+        if budget is None or count <= budget:
+            return
+        message = (
+            f"{method} {route}: {count} SQL-запросов при бюджете {budget}"
+        )
+        if settings.QUERY_BUDGET_STRICT:
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
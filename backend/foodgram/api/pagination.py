@@ -0,0 +1,112 @@
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+
+
+def estimate_count(queryset):
+    """Оценка числа строк по статистике PostgreSQL вместо COUNT(*)."""
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            estimate = cursor.fetchone()[0]
+            if estimate >= 0:
+                return estimate
+        sql, params = queryset.query.sql_with_params()
+        cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return plan[0]["Plan"]["Plan Rows"]
+
+
+class KeysetPagination(CursorPagination):
+    """Курсорная пагинация: ?cursor= (пустой курсор — первая страница).
+
+    ?count=exact возвращает точное число записей, ?count=estimate — оценку,
+    по умолчанию количество не считается. Queryset со своим порядком,
+    отличным от ordering, не принимается: курсор его бы молча заменил.
+    """
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "limit"
+    max_page_size = 100
+    count_query_param = "count"
+
+    def decode_cursor(self, request):
+        if not request.query_params.get(self.cursor_query_param):
+            return None
+        return super().decode_cursor(request)
+
+    def get_count(self, queryset, request):
+        mode = request.query_params.get(self.count_query_param)
+        if mode == "exact":
+            return queryset.count()
+        if mode == "estimate":
+            return estimate_count(queryset)
+        return None
+
+    def accepts(self, queryset):
+        order_by = tuple(queryset.query.order_by)
+        return not order_by or order_by == tuple(self.ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.accepts(queryset):
+            raise ImproperlyConfigured(
+                f"Курсорная пагинация упорядочивает по {self.ordering}, "
+                f"а queryset уже упорядочен по {queryset.query.order_by}"
+            )
+        self.count = self.get_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("count", self.count),
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+
+class SubscriptionKeysetPagination(KeysetPagination):
+    ordering = ("-id",)
+
+
+class PageNumberOrKeysetPagination(PageNumberPagination):
+    """Постраничная пагинация, а при наличии ?cursor= — курсорная.
+
+    Queryset со своим порядком, например поиск по релевантности, всегда
+    делится на страницы по номеру.
+    """
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        keyset = self.keyset_class()
+        if (
+            keyset.cursor_query_param in request.query_params
+            and keyset.accepts(queryset)
+        ):
+            self.keyset = keyset
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionPagination(PageNumberOrKeysetPagination):
+    keyset_class = SubscriptionKeysetPagination
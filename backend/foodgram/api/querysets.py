@@ -0,0 +1,77 @@
+from collections import defaultdict
+
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
+
+from recipes.models import (Favourite, IngredientsInRecipe, Recipe,
+                            ShoppingCart, Subscription)
+
+from .representations import PREVIEW_FIELDS, recipe_preview
+
+
+def annotate_user_flags(queryset, user):
+    """Флаги избранного, корзины и подписки одним запросом."""
+    if not user or not user.is_authenticated:
+        false = Value(False, output_field=BooleanField())
+        return queryset.annotate(
+            is_favorited=false,
+            is_in_shopping_cart=false,
+            author_is_subscribed=false,
+        )
+    return queryset.annotate(
+        is_favorited=Exists(
+            Favourite.objects.filter(user=user, recipe=OuterRef("pk"))
+        ),
+        is_in_shopping_cart=Exists(
+            ShoppingCart.objects.filter(user=user, recipe=OuterRef("pk"))
+        ),
+        author_is_subscribed=Exists(
+            Subscription.objects.filter(user=user, author=OuterRef("author"))
+        ),
+    )
+
+
+def recipe_feed(user, queryset=None):
+    """Рецепты для RecipeGetSerializer без запросов на каждую строку."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    queryset = queryset.select_related("author").prefetch_related(
+        "tags",
+        Prefetch(
+            "recipe",
+            queryset=IngredientsInRecipe.objects.select_related("ingredient"),
+        ),
+    )
+    return annotate_user_flags(queryset, user)
+
+
+def recipe_previews(author_ids, limit=None):
+    """Превью последних рецептов авторов, не больше limit на каждого."""
+    previews = defaultdict(list)
+    if not author_ids:
+        return previews
+    queryset = Recipe.objects.filter(author__in=author_ids)
+    if limit is not None:
+        ranked = (
+            queryset.order_by()
+            .annotate(
+                row_number=Window(
+                    RowNumber(),
+                    partition_by=F("author"),
+                    order_by=F("id").desc(),
+                )
+            )
+            .values("id", "row_number")
+        )
+        sql, params = ranked.query.sql_with_params()
+        queryset = Recipe.objects.filter(id__in=RawSQL(
+            f"SELECT id FROM ({sql}) ranked WHERE row_number <= %s",
+            (*params, limit),
+        ))
+    for author, *row in queryset.order_by("-id").values_list(
+        "author_id", *PREVIEW_FIELDS
+    ):
+        previews[author].append(recipe_preview(*row))
+    return previews
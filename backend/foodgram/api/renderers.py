@@ -0,0 +1,120 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework.negotiation import DefaultContentNegotiation
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FormatOnlyNegotiation(DefaultContentNegotiation):
+    """Выбор рендерера только по ?format=, заголовок Accept не важен."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        format = format_suffix or request.query_params.get(
+            self.settings.URL_FORMAT_OVERRIDE)
+        if format:
+            renderers = self.filter_renderers(renderers, format)
+        return renderers[0], renderers[0].media_type
+
+
+def has_floats(data):
+    """Есть ли float где-то внутри словарей и списков data."""
+    stack = [data]
+    while stack:
+        item = stack.pop()
+        if isinstance(item, float):
+            return True
+        if isinstance(item, dict):
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple)):
+            stack.extend(item)
+    return False
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson для компактного ответа.
+
+    Вывод байт в байт тот же, что у JSONRenderer: порядок ключей,
+    UTF-8 без \\u-экранирования и экранированные U+2028/U+2029. Даты
+    и всё, чего orjson не знает, отдаются кодировщику DRF. Числа float
+    orjson пишет иначе (0.00001 вместо 1e-05, null вместо ошибки для
+    NaN), поэтому данные с ними, как и с отступами, с ensure_ascii и без
+    установленного orjson, рендерит JSONRenderer.
+    """
+
+    options = (
+        orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+        if orjson else 0
+    )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            orjson is None
+            or data is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(
+                accepted_media_type, renderer_context or {}
+            ) is not None
+            or has_floats(data)
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options,
+            )
+        except TypeError:
+            return super().render(data, accepted_media_type, renderer_context)
+        return ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(
+            b"\xe2\x80\xa9", b"\\u2029"
+        )
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, ABC):
+    """Рендерер списка покупок, умеющий отдавать его построчно."""
+
+    charset = "utf-8"
+
+    @abstractmethod
+    def stream(self, rows):
+        """Строки файла для строк (название, единица, количество)."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return json.dumps(data, ensure_ascii=False).encode(self.charset)
+        return "".join(self.stream(data)).encode(self.charset)
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = "text/plain"
+    format = "txt"
+
+    def stream(self, rows):
+        yield "Список покупок:\n"
+        for name, unit, amount in rows:
+            if amount is None:
+                yield f"\n{name} - {unit}"
+            else:
+                yield f"\n{name} - {amount}, {unit}"
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(("Ингредиент", "Количество", "Мера измерения"))
+        for name, unit, amount in rows:
+            yield writer.writerow((name, amount, unit))
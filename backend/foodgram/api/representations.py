@@ -0,0 +1,183 @@
+"""Представления для чтения без сериализаторов DRF.
+
+Словари собираются прямо из строк values_list и ключ в ключ совпадают
+с выводом RecipeGetSerializer, FavouriteSerializer и
+SubcribeListSerializer.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from rest_framework.fields import DateTimeField
+
+from recipes.models import IngredientsInRecipe, Recipe
+
+RECIPE_FIELDS = (
+    "id",
+    "author_id",
+    "author__email",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+    "image",
+    "image_variants",
+    "name",
+    "text",
+    "cooking_time",
+    "created_at",
+    "favourites_count",
+    "carts_count",
+)
+PREVIEW_FIELDS = ("id", "name", "image", "image_variants", "cooking_time")
+SUBSCRIPTION_FIELDS = (
+    "id",
+    "author_id",
+    "author__email",
+    "author__username",
+    "author__first_name",
+    "author__last_name",
+    "author__recipes_count",
+)
+
+datetime_field = DateTimeField()
+
+
+def get_image_url(name):
+    return f"{settings.BASE_URL}{default_storage.url(name)}"
+
+
+def current_variants(image, variants):
+    """Уменьшенные копии, если они построены для текущей картинки."""
+    if variants.get("source") != image:
+        return {}
+    return variants
+
+
+def image_url(image):
+    if image:
+        return get_image_url(image)
+    return None
+
+
+def image_thumb(image, variants):
+    variants = current_variants(image, variants)
+    widths = [int(width) for width in variants if width.isdigit()]
+    if widths:
+        return get_image_url(variants[str(min(widths))])
+    return image_url(image)
+
+
+def image_srcset(image, variants):
+    variants = current_variants(image, variants)
+    widths = sorted(int(width) for width in variants if width.isdigit())
+    return ", ".join(
+        f"{get_image_url(variants[str(width)])} {width}w" for width in widths
+    )
+
+
+def recipe_preview(pk, name, image, variants, cooking_time):
+    """Краткое представление рецепта, как у FavouriteSerializer."""
+    return {
+        "id": pk,
+        "name": name,
+        "image": image_url(image),
+        "image_thumb": image_thumb(image, variants),
+        "image_srcset": image_srcset(image, variants),
+        "cooking_time": cooking_time,
+    }
+
+
+def recipe_tags(pks):
+    tags = defaultdict(list)
+    for recipe, pk, name, color, slug in (
+        Recipe.tags.through.objects.filter(recipe__in=pks)
+        .order_by("tag__name")
+        .values_list(
+            "recipe_id", "tag_id", "tag__name", "tag__color", "tag__slug"
+        )
+    ):
+        tags[recipe].append(
+            {"id": pk, "name": name, "color": color, "slug": slug}
+        )
+    return tags
+
+
+def recipe_ingredients(pks):
+    ingredients = defaultdict(list)
+    for recipe, pk, ingredient, name, unit, amount in (
+        IngredientsInRecipe.objects.filter(recipe__in=pks)
+        .order_by("-id")
+        .values_list(
+            "recipe_id",
+            "id",
+            "ingredient_id",
+            "ingredient__name",
+            "ingredient__measurement_unit",
+            "amount",
+        )
+    ):
+        ingredients[recipe].append({
+            "id": pk,
+            "ingredient": ingredient,
+            "name": name,
+            "measurement_unit": unit,
+            "amount": amount,
+        })
+    return ingredients
+
+
+def recipe_representations(pks):
+    """Рецепты pks в виде RecipeGetSerializer тремя запросами.
+
+    Флаги пользователя выставлены в False, как для анонима; настоящие
+    накладывает cache.overlay. Порядок — как у строк в базе.
+    """
+    tags = recipe_tags(pks)
+    ingredients = recipe_ingredients(pks)
+    return [
+        {
+            "id": pk,
+            "tags": tags[pk],
+            "author": {
+                "id": author,
+                "email": email,
+                "username": username,
+                "first_name": first_name,
+                "last_name": last_name,
+                "is_subscribed": False,
+            },
+            "image": image_url(image),
+            "image_thumb": image_thumb(image, variants),
+            "image_srcset": image_srcset(image, variants),
+            "is_favorited": False,
+            "is_in_shopping_cart": False,
+            "ingredients": ingredients[pk],
+            "count": 1,
+            "name": name,
+            "text": text,
+            "cooking_time": cooking_time,
+            "created_at": datetime_field.to_representation(created_at),
+            "favourites_count": favourites_count,
+            "carts_count": carts_count,
+        }
+        for (
+            pk, author, email, username, first_name, last_name, image,
+            variants, name, text, cooking_time, created_at,
+            favourites_count, carts_count,
+        ) in Recipe.objects.filter(pk__in=pks).order_by().values_list(
+            *RECIPE_FIELDS
+        )
+    ]
+
+
+def subscription_representation(row, recipes):
+    """Подписка из строки values(*SUBSCRIPTION_FIELDS) и превью рецептов."""
+    return {
+        "email": row["author__email"],
+        "id": row["author_id"],
+        "username": row["author__username"],
+        "first_name": row["author__first_name"],
+        "last_name": row["author__last_name"],
+        "recipes_count": row["author__recipes_count"],
+        "recipes": recipes,
+    }
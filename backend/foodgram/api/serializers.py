@@ -1,20 +1,33 @@
-from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.shortcuts import get_object_or_404
+from django.db import transaction
 from djoser.serializers import \
     UserCreateSerializer as DjoserUserCreateSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
 from recipes import validators
+from recipes.batch import MAX_BATCH
 from recipes.models import (CustomUser, Ingredient, IngredientsInRecipe,
                             Recipe, Subscription, Tag)
+from recipes.shopping_list import change_recipe
+
+from .catalogue import catalogue
+from .fields import CatalogueTagField, LimitedBase64ImageField
+from .querysets import recipe_previews
+from .representations import image_srcset, image_thumb, image_url
 
 User = CustomUser
 MAX = 32000
 MIN = 1
 
 
+def get_image_thumb(recipe):
+    return image_thumb(recipe.image.name, recipe.image_variants)
+
+
+def get_image_srcset(recipe):
+    return image_srcset(recipe.image.name, recipe.image_variants)
+
+
 class UserCreateSerializer(DjoserUserCreateSerializer):
     class Meta(DjoserUserCreateSerializer.Meta):
         model = User
@@ -42,6 +55,8 @@ class UserSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, "is_subscribed"):
+            return obj.is_subscribed
         request = self.context["request"]
         if request.user.is_authenticated:
             return request.user.follower.filter(author=obj).exists()
@@ -105,6 +120,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
     author = UserSerializer(read_only=True)
     ingredients = IngredientWriteSerializer(many=True, read_only=True)
     image = serializers.SerializerMethodField()
+    image_thumb = serializers.SerializerMethodField()
+    image_srcset = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     ingredients = serializers.SerializerMethodField()
@@ -114,11 +131,17 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         return 1
 
     def get_image(self, obj):
-        if obj.image:
-            return f"{settings.BASE_URL}{obj.image.url}"
-        return None
+        return image_url(obj.image.name)
+
+    def get_image_thumb(self, obj):
+        return get_image_thumb(obj)
+
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj)
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, "is_favorited"):
+            return obj.is_favorited
         request = self.context["request"]
 
         if request.user.is_authenticated:
@@ -126,6 +149,8 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         return False
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, "is_in_shopping_cart"):
+            return obj.is_in_shopping_cart
         request = self.context["request"]
 
         if request.user.is_authenticated:
@@ -136,18 +161,24 @@ class RecipeGetSerializer(serializers.ModelSerializer):
         qs = obj.recipe.all()
         return IngredientRecipeSerializer(qs, many=True).data
 
+    def to_representation(self, instance):
+        if hasattr(instance, "author_is_subscribed"):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        return super().to_representation(instance)
+
     class Meta:
         model = Recipe
-        fields = "__all__"
+        exclude = ("image_variants", "search_vector")
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
-    image = Base64ImageField(max_length=None, use_url=True, required=False)
+    image = LimitedBase64ImageField(max_length=None, use_url=True,
+                                    required=False)
     author = serializers.PrimaryKeyRelatedField(
         read_only=True,
         default=serializers.CurrentUserDefault(),
     )
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = CatalogueTagField(
         queryset=Tag.objects.all(),
         many=True,
     )
@@ -163,25 +194,62 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
     def validate(self, data):
-        ingredients = self.initial_data.get("ingredients", [])
+        ingredients = data.get("ingredients")
         if not ingredients:
             raise serializers.ValidationError(
                 "Добавьте хотя бы один ингредиент")
+        ingredient_ids = [ingredient["id"] for ingredient in ingredients]
+        if len(ingredient_ids) != len(set(ingredient_ids)):
+            raise serializers.ValidationError(
+                "Ингредиенты не должны повторяться")
+        missing = catalogue.missing_ingredients(ingredient_ids)
+        if missing:
+            raise serializers.ValidationError({
+                "ingredients": "Нет ингредиентов с id: " + ", ".join(
+                    map(str, sorted(missing)))
+            })
         return data
 
-    def ingredients_create(self, ingredients, recipe):
-        ingredients_in_recipe_list = []
-        for ingredient in ingredients:
-            ingredient_obj = get_object_or_404(Ingredient, id=ingredient["id"])
-            ingredients_in_recipe_list.append(
-                IngredientsInRecipe(
-                    recipe=recipe,
-                    ingredient=ingredient_obj,
-                    amount=ingredient["amount"],
-                )
+    def ingredients_save(self, ingredients, recipe, existing=()):
+        """Вставляет, меняет и удаляет только изменившиеся строки.
+
+        Возвращает {ингредиент: разница} по вставленным и изменённым
+        строкам: bulk_create и bulk_update идут без сигналов.
+        """
+        amounts = {
+            ingredient["id"]: ingredient["amount"]
+            for ingredient in ingredients
+        }
+        existing = {row.ingredient_id: row for row in existing}
+        deleted = [
+            row.pk for ingredient_id, row in existing.items()
+            if ingredient_id not in amounts
+        ]
+        changed = []
+        deltas = {}
+        for ingredient_id, row in existing.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and amount != row.amount:
+                deltas[ingredient_id] = amount - row.amount
+                row.amount = amount
+                changed.append(row)
+        created = [
+            IngredientsInRecipe(
+                recipe=recipe, ingredient_id=ingredient_id, amount=amount
             )
-        IngredientsInRecipe.objects.bulk_create(ingredients_in_recipe_list)
-
+            for ingredient_id, amount in amounts.items()
+            if ingredient_id not in existing
+        ]
+        if deleted:
+            IngredientsInRecipe.objects.filter(pk__in=deleted).delete()
+        if changed:
+            IngredientsInRecipe.objects.bulk_update(changed, ["amount"])
+        if created:
+            IngredientsInRecipe.objects.bulk_create(created)
+        deltas.update((row.ingredient_id, row.amount) for row in created)
+        return deltas
+
+    @transaction.atomic
     def create(self, validated_data):
         ingredients_data = validated_data.pop("ingredients")
         tags = validated_data.pop("tags")
@@ -193,16 +261,21 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         recipe = Recipe.objects.create(**validated_data)
         recipe.tags.set(tags)
 
-        self.ingredients_create(ingredients_data, recipe)
+        self.ingredients_save(ingredients_data, recipe)
 
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients_data = validated_data.pop("ingredients", [])
         tags = validated_data.pop("tags", [])
         instance.tags.set(tags)
-        IngredientsInRecipe.objects.filter(recipe=instance).delete()
-        self.ingredients_create(ingredients_data, instance)
+        deltas = self.ingredients_save(
+            ingredients_data,
+            instance,
+            IngredientsInRecipe.objects.filter(recipe=instance),
+        )
+        change_recipe(instance.pk, deltas)
 
         return super().update(instance, validated_data)
 
@@ -223,13 +296,14 @@ class SubcribeListSerializer(serializers.ModelSerializer):
     recipes = serializers.SerializerMethodField()
 
     def get_recipes(self, obj):
-        recipes = obj.author.recipes.all()
-        return RecipeGetSerializer(
-            recipes, many=True, context={"request": self.context["request"]}
-        ).data
+        recipes = getattr(obj, "recipe_previews", None)
+        if recipes is None:
+            limit = self.context.get("recipes_limit")
+            recipes = recipe_previews([obj.author_id], limit)[obj.author_id]
+        return recipes
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
+        return obj.author.recipes_count
 
     class Meta:
         model = Subscription
@@ -248,7 +322,23 @@ class FavouriteSerializer(serializers.Serializer):
     id = serializers.ReadOnlyField()
     name = serializers.ReadOnlyField()
     image = serializers.SerializerMethodField(read_only=True)
+    image_thumb = serializers.SerializerMethodField(read_only=True)
+    image_srcset = serializers.SerializerMethodField(read_only=True)
     cooking_time = serializers.ReadOnlyField()
 
     def get_image(self, obj):
-        return f"{settings.BASE_URL}{obj.image.url}"
+        return image_url(obj.image.name)
+
+    def get_image_thumb(self, obj):
+        return get_image_thumb(obj)
+
+    def get_image_srcset(self, obj):
+        return get_image_srcset(obj)
+
+
+class BatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH,
+    )
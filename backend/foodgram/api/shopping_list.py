@@ -0,0 +1,62 @@
+import hashlib
+
+from django.db.models import Count, F, FloatField, Max, Sum
+
+from recipes.models import ShoppingListItem
+from recipes.units import (DIMENSIONS, TO_TASTE, best_unit,
+                           dimension_expression, factor_expression,
+                           normalized_unit)
+
+CHUNK_SIZE = 2000
+LINES_VERSION = "units-1"
+
+
+def shopping_list_rows(user):
+    """Сводный список покупок, читаемый серверным курсором.
+
+    Количества одного ингредиента в разных единицах одной размерности
+    (г и кг, мл и ст. л.) складываются в базе одним GROUP BY, в Python
+    остаётся только выбрать единицу для каждой итоговой строки.
+    """
+    rows = (
+        ShoppingListItem.objects.filter(user=user)
+        .annotate(unit=normalized_unit("ingredient__measurement_unit"))
+        .annotate(
+            dimension=dimension_expression("unit"),
+            factor=factor_expression("unit"),
+        )
+        .values("ingredient__name", "dimension")
+        .annotate(
+            amount=Sum(
+                F("total_amount") * F("factor"), output_field=FloatField()
+            ),
+            raw_amount=Sum("total_amount"),
+            units=Count("unit", distinct=True),
+            raw_unit=Max("ingredient__measurement_unit"),
+        )
+        .order_by("ingredient__name", "dimension")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    for row in rows:
+        name, dimension = row["ingredient__name"], row["dimension"]
+        if dimension == TO_TASTE:
+            yield name, TO_TASTE, None
+        elif row["units"] == 1 or dimension not in DIMENSIONS:
+            yield name, row["raw_unit"], row["raw_amount"]
+        else:
+            yield (name, *best_unit(dimension, row["amount"]))
+
+
+def shopping_cart_etag(request, *args, **kwargs):
+    """Отпечаток сводного списка покупок по всем его строкам."""
+    fingerprint = hashlib.md5(
+        f"{LINES_VERSION}|{request.accepted_renderer.format}".encode()
+    )
+    for row in (
+        ShoppingListItem.objects.filter(user=request.user)
+        .order_by("ingredient_id")
+        .values_list("ingredient_id", "total_amount")
+        .iterator(chunk_size=CHUNK_SIZE)
+    ):
+        fingerprint.update(b"|%d:%d" % row)
+    return fingerprint.hexdigest()
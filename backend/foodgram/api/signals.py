@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.models import (Favourite, Ingredient, IngredientsInRecipe,
+                            Recipe, ShoppingCart, Subscription, Tag)
+from users.models import CustomUser
+
+from .autocomplete import ingredient_index
+from .cache import bump_version, invalidate_recipes, invalidate_user
+from .catalogue import catalogue
+from .matching import recipe_match_index
+from .middleware import request_tracker
+from .versions import bump_table
+
+
+@receiver(connection_created)
+def install_request_tracker(sender, connection, **kwargs):
+    if request_tracker not in connection.execute_wrappers:
+        connection.execute_wrappers.append(request_tracker)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    ingredient_index.invalidate()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def invalidate_recipe_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_recipes(instance.pk))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def invalidate_recipe_tags_cache(sender, instance, reverse, pk_set, **kwargs):
+    if reverse:
+        pks = pk_set or []
+    else:
+        pks = [instance.pk]
+    transaction.on_commit(lambda: invalidate_recipes(*pks))
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def invalidate_recipe_ingredients_cache(sender, instance, **kwargs):
+    transaction.on_commit(lambda: invalidate_recipes(instance.recipe_id))
+
+
+@receiver(post_save, sender=Favourite)
+@receiver(post_delete, sender=Favourite)
+def invalidate_favourite_cache(sender, instance, **kwargs):
+    def invalidate():
+        invalidate_recipes(instance.recipe_id)
+        invalidate_user(instance.user_id, "favourites")
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+def invalidate_shopping_cart_cache(sender, instance, **kwargs):
+    def invalidate():
+        invalidate_recipes(instance.recipe_id)
+        invalidate_user(instance.user_id, "carts")
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=Subscription)
+@receiver(post_delete, sender=Subscription)
+def invalidate_subscription_cache(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: invalidate_user(instance.user_id, "subscriptions")
+    )
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_author_cache(sender, instance, created, update_fields,
+                            **kwargs):
+    if created or (
+        update_fields and set(update_fields) <= {"last_login", "password"}
+    ):
+        return
+    pks = list(instance.recipes.values_list("id", flat=True))
+    transaction.on_commit(lambda: invalidate_recipes(*pks))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_catalogue_cache(sender, **kwargs):
+    transaction.on_commit(bump_version)
+    transaction.on_commit(lambda: bump_table(sender))
+    transaction.on_commit(catalogue.invalidate)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def refresh_recipe_match_index(sender, instance, **kwargs):
+    if kwargs.get("update_fields"):
+        return
+    transaction.on_commit(
+        lambda: recipe_match_index.refresh_recipe(instance.pk)
+    )
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def refresh_recipe_ingredients_match_index(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: recipe_match_index.refresh_recipe(instance.recipe_id)
+    )
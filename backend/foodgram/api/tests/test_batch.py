@@ -0,0 +1,80 @@
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import (Ingredient, IngredientsInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem)
+from users.models import CustomUser
+
+
+class ShoppingCartBatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email="reader@example.com", username="reader",
+            first_name="reader", last_name="reader", password="pass12345!",
+        )
+        cls.salt = Ingredient.objects.create(name="соль",
+                                             measurement_unit="г")
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.user, name=f"Рецепт {number}", text="Текст",
+                cooking_time=5,
+            )
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=cls.salt, amount=10
+            )
+            cls.recipes.append(recipe)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+        self.ids = [recipe.pk for recipe in self.recipes]
+
+    def batch(self, method, ids):
+        response = getattr(self.client, method)(
+            "/api/shopping_cart/batch/", {"ids": ids}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return [(row["id"], row["status"])
+                for row in response.json()["results"]]
+
+    def salt_total(self):
+        return ShoppingListItem.objects.filter(
+            user=self.user, ingredient=self.salt
+        ).values_list("total_amount", flat=True).first()
+
+    def test_duplicate_ids_reported_once(self):
+        first, second, _ = self.ids
+        self.assertEqual(
+            self.batch("post", [first, second, first, 999999]),
+            [(first, "created"), (second, "created"),
+             (999999, "not_found")],
+        )
+        self.assertEqual(self.salt_total(), 20)
+        self.assertEqual(
+            self.batch("delete", [second, second]), [(second, "deleted")]
+        )
+
+    def test_remove_updates_counters_and_shopping_list(self):
+        self.batch("post", self.ids)
+        self.assertEqual(self.salt_total(), 30)
+        self.assertEqual(
+            self.batch("delete", self.ids[:2]),
+            [(pk, "deleted") for pk in self.ids[:2]],
+        )
+        self.assertEqual(
+            list(ShoppingCart.objects.filter(user=self.user)
+                 .values_list("recipe_id", flat=True)),
+            self.ids[2:],
+        )
+        self.assertEqual(
+            list(Recipe.objects.filter(pk__in=self.ids).order_by("pk")
+                 .values_list("carts_count", flat=True)),
+            [0, 0, 1],
+        )
+        self.assertEqual(self.salt_total(), 10)
+        self.batch("delete", self.ids[2:])
+        self.assertIsNone(self.salt_total())
@@ -0,0 +1,48 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from api.pagination import KeysetPagination, PageNumberOrKeysetPagination
+from recipes.models import Recipe
+from users.models import CustomUser
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email="author@example.com", username="author",
+            first_name="author", last_name="author", password="pass12345!",
+        )
+        for name in ("Борщ", "Азу", "Винегрет"):
+            Recipe.objects.create(author=author, name=name, text="Текст",
+                                  cooking_time=5)
+
+    def request(self, query):
+        return Request(APIRequestFactory().get(f"/api/recipes/?{query}"))
+
+    def names(self, page):
+        return [recipe.name for recipe in page]
+
+    def test_keyset_orders_by_created_at(self):
+        paginator = PageNumberOrKeysetPagination()
+        page = paginator.paginate_queryset(
+            Recipe.objects.all(), self.request("cursor=")
+        )
+        self.assertIsNotNone(paginator.keyset)
+        self.assertEqual(self.names(page), ["Винегрет", "Азу", "Борщ"])
+
+    def test_own_ordering_falls_back_to_page_numbers(self):
+        paginator = PageNumberOrKeysetPagination()
+        page = paginator.paginate_queryset(
+            Recipe.objects.order_by("name"), self.request("cursor=")
+        )
+        self.assertIsNone(paginator.keyset)
+        self.assertEqual(self.names(page), ["Азу", "Борщ", "Винегрет"])
+
+    def test_keyset_refuses_own_ordering(self):
+        with self.assertRaises(ImproperlyConfigured):
+            KeysetPagination().paginate_queryset(
+                Recipe.objects.order_by("name"), self.request("cursor=")
+            )
@@ -0,0 +1,93 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.catalogue import catalogue
+from recipes.models import (Favourite, Ingredient, IngredientsInRecipe,
+                            Recipe, ShoppingCart, Subscription, Tag)
+from users.models import CustomUser
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    """Основные страницы укладываются в QUERY_BUDGETS с холодным кэшем.
+
+    Снимок справочников в процессе уже загружен, как после warm().
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = (
+            CustomUser.objects.create_user(
+                email=f"{name}@example.com", username=name,
+                first_name=name, last_name=name, password="pass12345!",
+            )
+            for name in ("reader", "author")
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", color="#FFFFFF",
+                                     slug="breakfast")
+        ingredient = Ingredient.objects.create(name="соль",
+                                               measurement_unit="г")
+        cls.recipes = []
+        for number in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.author, name=f"Рецепт {number}", text="Текст",
+                cooking_time=5,
+            )
+            recipe.tags.set([cls.tag])
+            IngredientsInRecipe.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=10
+            )
+            cls.recipes.append(recipe)
+        Favourite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        Subscription.objects.create(user=cls.user, author=cls.author)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def cold_cache(self):
+        """Пустой общий кэш и снимок справочников, который пора сверить."""
+        catalogue.invalidate()
+        catalogue.get()
+        cache.clear()
+        catalogue._checked_at = 0
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def test_cold_recipe_list(self):
+        for query in ("", "&cursor="):
+            with self.subTest(query=query):
+                self.cold_cache()
+                response = self.client.get(
+                    f"/api/recipes/?tags={self.tag.slug}{query}"
+                )
+                self.assertEqual(response.status_code, 200)
+                results = response.json()["results"]
+                self.assertEqual(len(results), 3)
+                flags = {
+                    recipe["id"]: (
+                        recipe["is_favorited"],
+                        recipe["is_in_shopping_cart"],
+                        recipe["author"]["is_subscribed"],
+                    )
+                    for recipe in results
+                }
+                self.assertEqual(flags[self.recipes[0].id],
+                                 (True, False, True))
+                self.assertEqual(flags[self.recipes[1].id],
+                                 (False, True, True))
+
+    def test_cold_detail_and_lists(self):
+        for url in (
+            f"/api/recipes/{self.recipes[0].id}/",
+            f"/api/favourites/?tags={self.tag.slug}",
+            "/api/subscriptions/",
+            "/api/recipes/shopping_list/",
+            "/api/ingredient/",
+            "/api/tags/",
+        ):
+            with self.subTest(url=url):
+                self.cold_cache()
+                self.assertEqual(self.client.get(url).status_code, 200)
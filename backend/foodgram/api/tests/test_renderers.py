@@ -0,0 +1,38 @@
+import math
+
+from django.test import SimpleTestCase
+from rest_framework.renderers import JSONRenderer
+
+from api.renderers import FastJSONRenderer
+
+
+class FastJSONRendererTests(SimpleTestCase):
+    """FastJSONRenderer отдаёт те же байты, что и JSONRenderer."""
+
+    def assertSameBytes(self, data):
+        self.assertEqual(
+            FastJSONRenderer().render(data), JSONRenderer().render(data)
+        )
+
+    def test_plain_data(self):
+        self.assertSameBytes({
+            "id": 1,
+            "name": "Блины\u2028с\u2029мёдом",
+            "tags": [{"slug": "breakfast"}],
+            "image": None,
+            "is_favorited": False,
+        })
+
+    def test_floats(self):
+        for value in (0.1, 1 / 3, 2.5, 1e-05, 1.5e-07, 1e16, 1e300, -0.0):
+            with self.subTest(value=value):
+                self.assertSameBytes({"amount": value})
+                self.assertSameBytes([{"rows": [("соль", "г", value)]}])
+
+    def test_non_finite_floats(self):
+        for value in (math.nan, math.inf, -math.inf):
+            with self.subTest(value=value):
+                with self.assertRaises(ValueError):
+                    JSONRenderer().render({"amount": value})
+                with self.assertRaises(ValueError):
+                    FastJSONRenderer().render({"amount": value})
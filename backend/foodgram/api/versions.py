@@ -0,0 +1,59 @@
+import uuid
+
+from django.core.cache import cache
+from django.db.models import F
+
+from recipes.models import TableVersion
+
+# Сколько секунд версия таблицы берётся из кэша без сверки с базой.
+# bump_table сбрасывает ключ сразу, но кэш LocMem у каждого процесса
+# свой, и там это предел отставания остальных процессов.
+TABLE_VERSION_TIMEOUT = 5
+
+
+def new_version():
+    return uuid.uuid4().hex
+
+
+def table_key(model):
+    return f"table:{model._meta.label_lower}:version"
+
+
+def table_versions(*models):
+    """Версии таблиц из строк TableVersion в базе, через кэш.
+
+    Таблицы, которых нет в кэше, читаются одним запросом.
+    """
+    keys = [table_key(model) for model in models]
+    versions = cache.get_many(keys)
+    missing = [model for model in models if table_key(model) not in versions]
+    if missing:
+        rows = dict(
+            TableVersion.objects.filter(
+                table__in=[model._meta.label_lower for model in missing]
+            ).values_list("table", "version")
+        )
+        fresh = {
+            table_key(model): rows.get(model._meta.label_lower, 0)
+            for model in missing
+        }
+        cache.set_many(fresh, TABLE_VERSION_TIMEOUT)
+        versions.update(fresh)
+    return tuple(versions[key] for key in keys)
+
+
+def table_version(model):
+    return table_versions(model)[0]
+
+
+def bump_table(model):
+    """Меняет версию таблицы, а с ней ETag всех её ответов."""
+    table = model._meta.label_lower
+    _, created = TableVersion.objects.get_or_create(
+        table=table, defaults={"version": 1}
+    )
+    if not created:
+        TableVersion.objects.filter(table=table).update(
+            version=F("version") + 1
+        )
+    cache.delete(table_key(model))
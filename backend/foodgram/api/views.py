@@ -1,25 +1,95 @@
+import re
+from functools import partial
+
 import django_filters
-from django.db.models import Q, Sum
-from django.http import HttpResponse
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
 from rest_framework import filters, generics, permissions, status
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import NotFound
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from recipes.models import (Favourite, Ingredient, IngredientsInRecipe, Recipe,
-                            ShoppingCart, Subscription, Tag)
+from recipes.batch import CREATED, DELETED, batch_add, batch_remove
+from recipes.feed import pull_large_authors
+from recipes.images import CHUNK_SIZE, store_image
+from recipes.models import (Favourite, FeedEntry, Ingredient,
+                            IngredientsInRecipe, Recipe, ShoppingCart,
+                            Subscription, Tag)
+from recipes.recommendations import DEFAULT_LIMIT as RECOMMENDED_LIMIT
+from recipes.recommendations import MAX_LIMIT as RECOMMENDED_MAX_LIMIT
+from recipes.recommendations import recommended_ids
+from recipes.search import search_highlights
 from users.models import CustomUser
 
+from .aio import AsyncViewMixin
+from .autocomplete import DEFAULT_LIMIT, MAX_LIMIT, ingredient_index
+from .cache import (get_recipes_data, get_user_sets, invalidate_recipes,
+                    invalidate_user)
+from .catalogue import catalogue
+from .conditional import (compressed_body, conditional_get, recipe_etag,
+                          table_etag)
 from .filters import IngredientFilter, RecipesFilter, TagFilter
-from .serializers import (FavouriteSerializer, IngredientSerializer,
-                          RecipeCreateSerializer, RecipeGetSerializer,
-                          SubcribeListSerializer, SubscriptionCreateSerializer,
-                          TagSerializer)
+from .matching import DEFAULT_LIMIT as MATCH_DEFAULT_LIMIT
+from .matching import MAX_LIMIT as MATCH_MAX_LIMIT
+from .matching import recipe_match_index
+from .metrics import registry
+from .pagination import (KeysetPagination, PageNumberOrKeysetPagination,
+                         SubscriptionPagination)
+from .querysets import recipe_feed, recipe_previews
+from .renderers import (FastJSONRenderer, FormatOnlyNegotiation,
+                        ShoppingListCSVRenderer, ShoppingListTextRenderer)
+from .representations import SUBSCRIPTION_FIELDS, subscription_representation
+from .serializers import (BatchSerializer, FavouriteSerializer,
+                          IngredientSerializer, RecipeCreateSerializer,
+                          RecipeGetSerializer, SubcribeListSerializer,
+                          SubscriptionCreateSerializer, TagSerializer)
+from .shopping_list import shopping_cart_etag, shopping_list_rows
+from .versions import table_version
+
+ACCEPTS_GZIP = re.compile(r"\bgzip\b")
+
+
+def accepts_gzip(request):
+    return bool(
+        ACCEPTS_GZIP.search(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    )
+
+
+def full_ingredient_list(request):
+    return (
+        not request.query_params
+        and request.accepted_renderer.format == "json"
+    )
+
 
+def ingredient_list_etag(request, *args, **kwargs):
+    """ETag справочника ингредиентов; у сжатого тела он свой."""
+    etag = table_etag(Ingredient)(request, *args, **kwargs)
+    if full_ingredient_list(request) and accepts_gzip(request):
+        return f"{etag}-gzip"
+    return etag
 
-class TagList(generics.ListAPIView):
+
+def get_recipes_limit(request):
+    try:
+        return max(int(request.query_params["recipes_limit"]), 0)
+    except (KeyError, ValueError):
+        return None
+
+
+catalogue_get = partial(conditional_get, max_age=settings.CATALOGUE_MAX_AGE)
+
+
+class TagList(AsyncViewMixin, generics.ListAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
@@ -33,14 +103,22 @@ class TagList(generics.ListAPIView):
         "^name",
     ]
 
+    @method_decorator(catalogue_get(table_etag(Tag)))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
 
-class TagDetail(generics.RetrieveAPIView):
+
+class TagDetail(AsyncViewMixin, generics.RetrieveAPIView):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.AllowAny]
 
+    @method_decorator(catalogue_get(table_etag(Tag)))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
-class IngredientList(generics.ListAPIView):
+class IngredientList(AsyncViewMixin, generics.ListAPIView):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
@@ -51,17 +129,66 @@ class IngredientList(generics.ListAPIView):
     ]
     filterset_class = IngredientFilter
 
+    def get_limit(self):
+        try:
+            limit = int(self.request.query_params.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            limit = DEFAULT_LIMIT
+        return max(1, min(limit, MAX_LIMIT))
+
+    @method_decorator(catalogue_get(ingredient_list_etag))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def full_list(self, request):
+        """Весь справочник готовым телом, сжатым заранее."""
+        body, compressed = compressed_body(
+            f"ingredients:body:{table_version(Ingredient)}",
+            lambda: FastJSONRenderer().render(
+                self.get_serializer(self.get_queryset(), many=True).data
+            ),
+        )
+        response = HttpResponse(body, content_type="application/json")
+        if accepts_gzip(request):
+            response = HttpResponse(
+                compressed, content_type="application/json"
+            )
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
 
-class IngredientDetail(generics.RetrieveAPIView):
+    def list(self, request, *args, **kwargs):
+        if full_ingredient_list(request):
+            return self.full_list(request)
+        name = request.query_params.get("name")
+        if not name and "limit" not in request.query_params:
+            return super().list(request, *args, **kwargs)
+        limit = self.get_limit()
+        if (
+            name
+            and settings.INGREDIENT_INDEX_IN_MEMORY
+            and "measurement_unit" not in request.query_params
+        ):
+            return Response(ingredient_index.search(name, limit))
+        queryset = self.filter_queryset(self.get_queryset())[:limit]
+        serializer = self.get_serializer(queryset, many=True)
+        return Response(serializer.data)
+
+
+class IngredientDetail(AsyncViewMixin, generics.RetrieveAPIView):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = [permissions.AllowAny]
 
+    @method_decorator(catalogue_get(table_etag(Ingredient)))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
 
-class RecipeListCreate(generics.ListCreateAPIView):
+class RecipeListCreate(AsyncViewMixin, generics.ListCreateAPIView):
     queryset = Recipe.objects.all()
     serializer_class = RecipeGetSerializer
-    pagination_class = PageNumberPagination
+    pagination_class = PageNumberOrKeysetPagination
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly,
     ]
@@ -78,33 +205,60 @@ class RecipeListCreate(generics.ListCreateAPIView):
         is_in_cart = self.request.query_params.get("is_in_shopping_cart")
         if is_in_cart:
             return Recipe.objects.all()
-        tags = self.request.query_params.getlist("tags")
-        return Recipe.objects.filter(tags__slug__in=tags).distinct()
+        tags = catalogue.tag_ids(self.request.query_params.getlist("tags"))
+        return Recipe.objects.filter(tags__in=tags).distinct()
 
     def get_serializer_class(self):
         if self.request.method == "GET":
             return RecipeGetSerializer
         return RecipeCreateSerializer
 
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset.values("id", "created_at"))
+        pks = [row["id"] for row in page]
+        data = get_recipes_data(pks, request)
+        query = request.query_params.get("q")
+        if query:
+            highlights = search_highlights(pks, query)
+            data = [
+                dict(recipe, highlight=highlights.get(recipe["id"]))
+                for recipe in data
+            ]
+        return self.get_paginated_response(data)
+
     def create(self, request, *args, **kwargs):
         serializer = RecipeCreateSerializer(
             data=request.data, context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
         serializer.save(author=request.user)
+        recipe = recipe_feed(request.user).get(pk=serializer.instance.pk)
         sz = RecipeGetSerializer(
-            serializer.instance, many=False, context={"request": request}
+            recipe, many=False, context={"request": request}
         )
         return Response(sz.data, status=status.HTTP_201_CREATED)
 
 
-class RecipeRetrieveUpdateDelete(generics.RetrieveUpdateDestroyAPIView):
+class RecipeRetrieveUpdateDelete(
+    AsyncViewMixin, generics.RetrieveUpdateDestroyAPIView
+):
     queryset = Recipe.objects.all()
     serializer_class = RecipeGetSerializer
     permission_classes = [
         permissions.IsAuthenticatedOrReadOnly,
     ]
 
+    @method_decorator(conditional_get(recipe_etag, per_user=True))
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        data = get_recipes_data([self.kwargs["pk"]], request)
+        if not data:
+            raise NotFound
+        return Response(data[0])
+
     def get_serializer_class(self):
         if self.request.method == "GET":
             return RecipeGetSerializer
@@ -117,13 +271,48 @@ class RecipeRetrieveUpdateDelete(generics.RetrieveUpdateDestroyAPIView):
         )
         serializer.is_valid(raise_exception=True)
         serializer.save(author=request.user)
+        recipe = recipe_feed(request.user).get(pk=serializer.instance.pk)
         sz = RecipeGetSerializer(
-            serializer.instance, many=False, context={"request": request}
+            recipe, many=False, context={"request": request}
         )
         return Response(sz.data, status=status.HTTP_200_OK)
 
 
-class FavouriteListView(generics.ListAPIView):
+class RecipeImageUpload(APIView):
+    """Загрузка картинки рецепта файлом: multipart (поле image) или телом
+    запроса с типом картинки.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def put(self, request, pk):
+        recipe = get_object_or_404(Recipe, pk=pk)
+        if recipe.author != request.user:
+            return Response(
+                {"errors": "Картинку может менять только автор рецепта"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+        if request.content_type.startswith("multipart/form-data"):
+            upload = request.FILES.get("image")
+            chunks = upload.chunks() if upload else ()
+        elif request.stream is not None:
+            chunks = iter(partial(request.stream.read, CHUNK_SIZE), b"")
+        else:
+            chunks = ()
+        try:
+            name = store_image(chunks)
+        except ValidationError as error:
+            return Response({"errors": error.messages},
+                            status=status.HTTP_400_BAD_REQUEST)
+        recipe.image.name = name
+        recipe.save(update_fields=["image"])
+        return Response(FavouriteSerializer(recipe).data)
+
+    post = put
+
+
+class FavouriteListView(AsyncViewMixin, generics.ListAPIView):
     queryset = Favourite.objects.all()
     serializer_class = FavouriteSerializer
     pagination_class = None
@@ -136,17 +325,19 @@ class FavouriteListView(generics.ListAPIView):
         tags = self.request.query_params.getlist("tags")
         if tags:
             return Recipe.objects.filter(
-                Q(id__in=fvs) & Q(tags__slug__in=tags)
+                Q(id__in=fvs) & Q(tags__in=catalogue.tag_ids(tags))
             ).distinct()
         return Recipe.objects.none()
 
     def list(self, request, *args, **kwargs):
-        qs = self.get_queryset()
-        serializer = RecipeGetSerializer(qs, many=True,
-                                         context={"request": request})
-        return Response(
-            {"results": serializer.data, "count": self.get_queryset().count()}
-        )
+        qs = self.get_queryset().values("id", "created_at")
+        if KeysetPagination.cursor_query_param in request.query_params:
+            paginator = KeysetPagination()
+            page = paginator.paginate_queryset(qs, request, view=self)
+            data = get_recipes_data([row["id"] for row in page], request)
+            return paginator.get_paginated_response(data)
+        data = get_recipes_data([row["id"] for row in qs], request)
+        return Response({"results": data, "count": len(data)})
 
 
 class FavouriteCreateDelete(generics.CreateAPIView, generics.DestroyAPIView):
@@ -164,13 +355,14 @@ class FavouriteCreateDelete(generics.CreateAPIView, generics.DestroyAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         recipe = get_object_or_404(Recipe, id=recipe)
-        favourite = request.user.favourites.filter(recipe=recipe)
-        if favourite.exists():
+        try:
+            with transaction.atomic():
+                Favourite.objects.create(user=request.user, recipe=recipe)
+        except IntegrityError:
             return Response(
                 {"errors": "Рецепт уже есть в избранном"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        favourite = Favourite.objects.create(user=request.user, recipe=recipe)
         serializer = FavouriteSerializer(recipe, many=False)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -182,13 +374,12 @@ class FavouriteCreateDelete(generics.CreateAPIView, generics.DestroyAPIView):
                 status=status.HTTP_400_BAD_REQUEST,
             )
         recipe = get_object_or_404(Recipe, id=recipe)
-        favourite = request.user.favourites.filter(recipe=recipe)
-        if not favourite.exists():
+        deleted, _ = request.user.favourites.filter(recipe=recipe).delete()
+        if not deleted:
             return Response(
                 {"errors": "Рецепт уже есть в избранном"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        favourite.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
@@ -208,15 +399,14 @@ class ShoppingCartCreateDelete(generics.CreateAPIView,
                 status=status.HTTP_400_BAD_REQUEST,
             )
         recipe = get_object_or_404(Recipe, id=recipe)
-        shopping_cart = request.user.shopping_cart.filter(recipe=recipe)
-
-        if shopping_cart.exists():
+        try:
+            with transaction.atomic():
+                ShoppingCart.objects.create(user=request.user, recipe=recipe)
+        except IntegrityError:
             return Response(
                 {"errors": "Рецепт уже есть в списке покупок"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        shopping_cart = ShoppingCart.objects.create(user=request.user,
-                                                    recipe=recipe)
         serializer = FavouriteSerializer(recipe, many=False)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
@@ -228,44 +418,201 @@ class ShoppingCartCreateDelete(generics.CreateAPIView,
                 status=status.HTTP_400_BAD_REQUEST,
             )
         recipe = get_object_or_404(Recipe, id=recipe)
-        shopping_cart = request.user.shopping_cart.filter(recipe=recipe)
-        if not shopping_cart.exists():
+        deleted, _ = request.user.shopping_cart.filter(recipe=recipe).delete()
+        if not deleted:
             return Response(
                 {"errors": "Рецепт уже есть в списке покупок"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        shopping_cart.delete()
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
+class BatchRelationView(APIView):
+    """Добавление (POST) и удаление (DELETE) пачки связей {"ids": [...]}
+    с отчётом по каждому id.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+    model = None
+    user_set = None
+
+    def get_ids(self, request):
+        """id из запроса без повторов, в порядке первого появления.
+
+        В ответе по одной записи на каждый уникальный id.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data["ids"]))
+
+    def invalidate(self, user_id, pks):
+        invalidate_user(user_id, self.user_set)
+        if self.model is not Subscription:
+            invalidate_recipes(*pks)
+
+    def respond(self, statuses, changed_status):
+        changed = [pk for pk, value in statuses.items()
+                   if value == changed_status]
+        if changed:
+            user_id = self.request.user.pk
+            transaction.on_commit(lambda: self.invalidate(user_id, changed))
+        return Response({"results": [
+            {"id": pk, "status": value} for pk, value in statuses.items()
+        ]})
+
+    def post(self, request):
+        statuses = batch_add(self.model, request.user, self.get_ids(request))
+        return self.respond(statuses, CREATED)
+
+    def delete(self, request):
+        statuses = batch_remove(
+            self.model, request.user, self.get_ids(request)
+        )
+        return self.respond(statuses, DELETED)
+
+
+class FavouriteBatch(BatchRelationView):
+    model = Favourite
+    user_set = "favourites"
+
+
+class ShoppingCartBatch(BatchRelationView):
+    model = ShoppingCart
+    user_set = "carts"
+
+
+class SubscriptionBatch(BatchRelationView):
+    model = Subscription
+    user_set = "subscriptions"
+
+
 class DownloadShoppingCart(APIView):
     queryset = ShoppingCart.objects.all()
     serializer_class = FavouriteSerializer
     pagination_class = None
     permission_classes = [permissions.IsAuthenticated]
+    renderer_classes = [ShoppingListTextRenderer, ShoppingListCSVRenderer]
+    content_negotiation_class = FormatOnlyNegotiation
 
+    @method_decorator(condition(etag_func=shopping_cart_etag))
     def get(self, request, *args, **kwargs):
-        ingredients = (
-            IngredientsInRecipe.objects.filter(
-                recipe__carts__user=request.user)
-            .values("ingredient__name", "ingredient__measurement_unit")
-            .annotate(ingredient_amount=Sum("amount"))
+        renderer = request.accepted_renderer
+        response = StreamingHttpResponse(
+            renderer.stream(shopping_list_rows(request.user)),
+            content_type=f"{renderer.media_type}; charset={renderer.charset}",
         )
-        shopping_list = ["Список покупок:\n"]
-        for ingredient in ingredients:
-            name = ingredient["ingredient__name"]
-            unit = ingredient["ingredient__measurement_unit"]
-            amount = ingredient["ingredient_amount"]
-            shopping_list.append(f"\n{name} - {amount}, {unit}")
-        response = HttpResponse(shopping_list, content_type="text/plain")
-        response["Content-Disposition"] = ("attachment;"
-                                           'filename="shopping_cart.txt"')
+        response["Content-Disposition"] = (
+            "attachment;"
+            f'filename="shopping_cart.{renderer.format}"'
+        )
+        response["Cache-Control"] = "private, no-cache"
         return response
 
 
-class SubscribeList(generics.ListAPIView):
+class RecipeMatch(APIView):
+    """Рецепты, для которых уже есть больше всего ингредиентов из have."""
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            have = {
+                int(pk) for pk in request.query_params.get("have", "")
+                .split(",") if pk.strip()
+            }
+            limit = min(
+                int(request.query_params.get("limit", MATCH_DEFAULT_LIMIT)),
+                MATCH_MAX_LIMIT,
+            )
+            offset = int(request.query_params.get("offset", 0))
+        except ValueError:
+            return Response(
+                {"errors": "have, limit и offset должны быть числами"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if not have or limit < 1 or offset < 0:
+            return Response(
+                {"errors": "Передайте id ингредиентов в have через запятую"},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        count, page = recipe_match_index.match(have, limit, offset)
+        recipes = {
+            recipe["id"]: recipe
+            for recipe in get_recipes_data([row[0] for row in page], request)
+        }
+        results = []
+        for pk, matched, total in page:
+            if pk not in recipes:
+                continue
+            recipe = recipes[pk]
+            results.append(dict(
+                recipe,
+                matched=matched,
+                total=total,
+                missing=[
+                    ingredient for ingredient in recipe["ingredients"]
+                    if ingredient["ingredient"] not in have
+                ],
+            ))
+        return Response({"count": count, "results": results})
+
+
+class RecipeRecommended(APIView):
+    """Рекомендации по похожим рецептам из build_recommendations."""
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            limit = int(
+                request.query_params.get("limit", RECOMMENDED_LIMIT)
+            )
+        except ValueError:
+            limit = RECOMMENDED_LIMIT
+        limit = max(1, min(limit, RECOMMENDED_MAX_LIMIT))
+        user_sets = get_user_sets(request.user)
+        pks = recommended_ids(
+            request.user,
+            limit,
+            exclude=user_sets["favourites"] | user_sets["carts"],
+            authors=user_sets["subscriptions"],
+        )
+        return Response(get_recipes_data(pks, request))
+
+
+class FeedList(generics.ListAPIView):
+    """Новые рецепты авторов из подписок, курсорная пагинация."""
+
+    serializer_class = RecipeGetSerializer
+    pagination_class = KeysetPagination
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        pull_large_authors(self.request.user)
+        return FeedEntry.objects.filter(user=self.request.user)
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.get_queryset().values("recipe_id", "created_at", "id")
+        )
+        data = get_recipes_data([row["recipe_id"] for row in page], request)
+        return self.get_paginated_response(data)
+
+
+class ShoppingListPreview(APIView):
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        return Response([
+            {"name": name, "measurement_unit": unit, "amount": amount}
+            for name, unit, amount in shopping_list_rows(request.user)
+        ])
+
+
+class SubscribeList(AsyncViewMixin, generics.ListAPIView):
     queryset = Subscription.objects.all()
     serializer_class = SubcribeListSerializer
+    pagination_class = SubscriptionPagination
     permission_classes = [permissions.IsAuthenticated]
     filter_backends = [
         django_filters.rest_framework.DjangoFilterBackend,
@@ -273,10 +620,26 @@ class SubscribeList(generics.ListAPIView):
     ]
 
     def get_queryset(self):
-        recipes_limit = self.request.query_params.get("recipes_limit")
-        if recipes_limit:
-            return self.request.user.follower.all()[: int(recipes_limit)]
-        return self.request.user.follower.all()
+        return self.request.user.follower.select_related("author")
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["recipes_limit"] = get_recipes_limit(self.request)
+        return context
+
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(
+            self.filter_queryset(self.get_queryset()).values(
+                *SUBSCRIPTION_FIELDS
+            )
+        )
+        previews = recipe_previews(
+            [row["author_id"] for row in page], get_recipes_limit(request)
+        )
+        return self.get_paginated_response([
+            subscription_representation(row, previews[row["author_id"]])
+            for row in page
+        ])
 
 
 class SubscribeCreateDelete(generics.CreateAPIView, generics.DestroyAPIView):
@@ -293,18 +656,36 @@ class SubscribeCreateDelete(generics.CreateAPIView, generics.DestroyAPIView):
                 {"errors": "Not author"}, status=status.HTTP_400_BAD_REQUEST
             )
         author = get_object_or_404(CustomUser, id=author)
-        subscribe = request.user.follower.filter(author=author)
-        if subscribe.exists():
+        try:
+            with transaction.atomic():
+                subscribe = Subscription.objects.create(user=request.user,
+                                                        author=author)
+        except IntegrityError:
             return Response(
                 {"errors": "Подписка уже существует"},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        subscribe = Subscription.objects.create(user=request.user,
-                                                author=author)
         serializer = SubcribeListSerializer(
-            subscribe, many=False, context={"request": request}
+            subscribe,
+            many=False,
+            context={
+                "request": request,
+                "recipes_limit": get_recipes_limit(request),
+            },
         )
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    def destroy(self, request, *args, **kwargs):
-        return super().destroy(request, *args, **kwargs)
+    def get_queryset(self):
+        return self.request.user.follower.all()
+
+
+class MetricsView(APIView):
+    """Гистограммы запросов по маршрутам в формате Prometheus."""
+
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(
+            registry.render(),
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
@@ -39,6 +39,7 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "api.middleware.InstrumentationMiddleware",
 ]
 
 ROOT_URLCONF = "foodgram.urls"
@@ -63,15 +64,33 @@ WSGI_APPLICATION = "foodgram.wsgi.application"
 
 DATABASES = {
     "default": {
-        "ENGINE": "django.db.backends.postgresql",
+        "ENGINE": os.getenv("DB_ENGINE", "django.db.backends.postgresql"),
         "NAME": os.getenv("POSTGRES_DB", "django"),
         "USER": os.getenv("POSTGRES_USER", "django"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", ""),
         "PORT": os.getenv("DB_PORT", 5432),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+    }
+}
+# Постоянные соединения (DB_CONN_MAX_AGE > 0) включаются явно. ASGI-
+# развёртывание включает их в gunicorn_asgi.py: там каждый поток пулов
+# ASYNC_VIEW_THREADS и ASYNC_LOOKUP_THREADS держит своё соединение, и
+# процессы урезаются под бюджет ASGI_DB_CONNECTIONS.
+
+# Кэш общий для всех процессов: в продакшене Redis (CACHE_BACKEND и
+# CACHE_LOCATION в infra/.env), LocMem только для тестов и разработки.
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
     }
 }
 
+RECIPE_CACHE_TIMEOUT = int(os.getenv("RECIPE_CACHE_TIMEOUT", 60 * 60))
+CATALOGUE_MAX_AGE = int(os.getenv("CATALOGUE_MAX_AGE", 5 * 60))
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,6 +115,10 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
         "rest_framework.authentication.TokenAuthentication",
     ),
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
     "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
     "PAGE_SIZE": 10,
 }
@@ -137,3 +160,37 @@ DJOSER = {
 
 MIN_TIME = 1
 MAX_TIME = 120
+
+INGREDIENT_INDEX_IN_MEMORY = (
+    os.getenv("INGREDIENT_INDEX_IN_MEMORY", "False") == "True"
+)
+
+RECIPE_MATCH_INDEX_TTL = int(os.getenv("RECIPE_MATCH_INDEX_TTL", 600))
+
+FEED_FANOUT_LIMIT = int(os.getenv("FEED_FANOUT_LIMIT", 10000))
+
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "False") == "True"
+ASYNC_VIEW_THREADS = int(os.getenv("ASYNC_VIEW_THREADS", 16))
+ASYNC_LOOKUP_THREADS = int(os.getenv("ASYNC_LOOKUP_THREADS", 8))
+
+IMAGE_MAX_UPLOAD_SIZE = 10 * 1024 * 1024
+IMAGE_MAX_PIXELS = 40_000_000
+IMAGE_VARIANT_WIDTHS = (320, 960)
+IMAGE_WORKERS = int(os.getenv("IMAGE_WORKERS", 2))
+
+# Бюджеты по замерам с холодным кэшем: для списка рецептов это токен,
+# версия справочников, COUNT, страница, три запроса на рецепты, теги и
+# ингредиенты и один UNION по избранному, корзине и подпискам.
+QUERY_BUDGETS = {
+    "GET api/recipes/": 8,
+    "GET api/recipes/<int:pk>/": 8,
+    "GET api/recipes/download_shopping_cart/": 4,
+    "GET api/recipes/shopping_list/": 4,
+    "GET api/recipes/recommended/": 10,
+    "GET api/favourites/": 8,
+    "GET api/subscriptions/": 8,
+    "GET api/feed/": 10,
+    "GET api/ingredient/": 4,
+    "GET api/tags/": 4,
+}
+QUERY_BUDGET_STRICT = os.getenv("QUERY_BUDGET_STRICT", "False") == "True"
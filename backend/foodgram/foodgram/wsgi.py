@@ -5,3 +5,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 
 application = get_wsgi_application()
+
+from api.catalogue import catalogue  # noqa: E402
+from api.matching import recipe_match_index  # noqa: E402
+
+catalogue.warm()
+recipe_match_index.warm()
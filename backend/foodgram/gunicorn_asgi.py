@@ -0,0 +1,36 @@
+# Запуск под ASGI: gunicorn -c gunicorn_asgi.py foodgram.asgi
+import multiprocessing
+import os
+
+# Кэш хранит версии и отметки, по которым процессы сверяют ETag и
+# снимки справочников, поэтому он должен быть общим с WSGI-развёртыванием.
+if "locmem" in os.getenv("CACHE_BACKEND", "locmem").lower():
+    raise RuntimeError(
+        "ASGI-развёртыванию нужен общий кэш: задайте CACHE_BACKEND и "
+        "CACHE_LOCATION, например Redis из infra/.env"
+    )
+
+# Процесс держит до ASYNC_VIEW_THREADS + ASYNC_LOOKUP_THREADS + 1
+# соединений с базой. ASGI_DB_CONNECTIONS — доля max_connections
+# PostgreSQL для этого развёртывания, число процессов урезается под неё.
+CONNECTIONS_PER_WORKER = (
+    int(os.getenv("ASYNC_VIEW_THREADS", 16))
+    + int(os.getenv("ASYNC_LOOKUP_THREADS", 8))
+    + 1
+)
+DB_CONNECTIONS = int(os.getenv("ASGI_DB_CONNECTIONS", 50))
+
+bind = os.getenv("ASGI_BIND", "0.0.0.0:8007")
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = max(1, min(
+    int(os.getenv("ASGI_WORKERS", multiprocessing.cpu_count())),
+    DB_CONNECTIONS // CONNECTIONS_PER_WORKER,
+))
+keepalive = 5
+graceful_timeout = 30
+# Потоки пулов переиспользуют соединения между вызовами, иначе каждое
+# представление и каждая параллельная выборка открывали бы новое.
+raw_env = [
+    "ASYNC_VIEWS=True",
+    f"DB_CONN_MAX_AGE={os.getenv('DB_CONN_MAX_AGE', 60)}",
+]
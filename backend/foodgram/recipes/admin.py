@@ -12,6 +12,7 @@ class RecipeAdmin(admin.ModelAdmin):
         "name",
         "image",
         "text",
+        "favourites_count",
     )
 
 
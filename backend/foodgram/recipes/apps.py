@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class RecipesConfig(AppConfig):
     name = "recipes"
+
+    def ready(self):
+        from .search import create_search_index
+        from .signals import create_trigram_index
+
+        post_migrate.connect(create_trigram_index, sender=self)
+        post_migrate.connect(create_search_index, sender=self)
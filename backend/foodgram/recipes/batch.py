@@ -0,0 +1,131 @@
+from django.db import connections, router, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .feed import remove_authors, schedule_backfill
+from .models import Favourite, Recipe, ShoppingCart, Subscription, User
+from .shopping_list import change_cart
+
+MAX_BATCH = 500
+
+CREATED = "created"
+EXISTS = "exists"
+DELETED = "deleted"
+MISSING = "missing"
+NOT_FOUND = "not_found"
+
+# Связь -> (поле цели, модель цели, денормализованный счётчик).
+RELATIONS = {
+    Favourite: ("recipe", Recipe, "favourites_count"),
+    ShoppingCart: ("recipe", Recipe, "carts_count"),
+    Subscription: ("author", User, "subscribers_count"),
+}
+
+
+def count_by(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def recount(model, pks):
+    """Пересчитывает счётчик целей pks одним UPDATE.
+
+    bulk_create и QuerySet.delete без сигналов не трогают счётчики,
+    а пересчёт по факту не зависит от гонок с параллельными запросами.
+    """
+    field, target, counter = RELATIONS[model]
+    target.objects.filter(pk__in=pks).update(
+        **{counter: count_by(model, field)}
+    )
+
+
+def after_change(model, user_id, pks, created):
+    """То, что для одиночных записей делают сигналы."""
+    if not pks:
+        return
+    recount(model, pks)
+    if model is ShoppingCart:
+        change_cart(user_id, pks, 1 if created else -1)
+    elif model is Subscription:
+        if created:
+            for author in pks:
+                schedule_backfill(user_id, author)
+        else:
+            remove_authors(user_id, pks)
+
+
+def delete_links(model, user, field, pks):
+    """Один DELETE без сигналов и сборщика каскадов.
+
+    У связей нет зависимых строк, а то, что делают их сигналы,
+    выполняет after_change.
+    """
+    if not pks:
+        return
+    opts = model._meta
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(opts.db_table)} "
+            f"WHERE {quote(opts.get_field('user').column)} = %s "
+            f"AND {quote(opts.get_field(field).column)} IN "
+            f"({', '.join(['%s'] * len(pks))})",
+            [user.pk, *pks],
+        )
+
+
+def split_ids(model, user, ids):
+    field, target, _ = RELATIONS[model]
+    found = set(
+        target.objects.filter(pk__in=ids).values_list("pk", flat=True)
+    )
+    linked = set(
+        model.objects.filter(user=user, **{f"{field}__in": found})
+        .values_list(f"{field}_id", flat=True)
+    )
+    return found, linked
+
+
+@transaction.atomic
+def batch_add(model, user, ids):
+    """Добавляет пользователю связи с целями ids одной вставкой.
+
+    Возвращает статус по каждому id: created, exists или not_found.
+    """
+    field, _, _ = RELATIONS[model]
+    found, linked = split_ids(model, user, ids)
+    new = found - linked
+    model.objects.bulk_create(
+        [model(user=user, **{f"{field}_id": pk}) for pk in new],
+        ignore_conflicts=True,
+    )
+    after_change(model, user.pk, new, created=True)
+    return {
+        pk: CREATED if pk in new else EXISTS if pk in found else NOT_FOUND
+        for pk in ids
+    }
+
+
+@transaction.atomic
+def batch_remove(model, user, ids):
+    """Удаляет связи пользователя с целями ids одним DELETE.
+
+    Возвращает статус по каждому id: deleted, missing или not_found.
+    """
+    field, _, _ = RELATIONS[model]
+    found, linked = split_ids(model, user, ids)
+    delete_links(model, user, field, linked)
+    after_change(model, user.pk, linked, created=False)
+    return {
+        pk: DELETED if pk in linked else MISSING if pk in found else NOT_FOUND
+        for pk in ids
+    }
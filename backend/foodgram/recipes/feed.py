@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+
+from .models import FeedEntry, Recipe, Subscription, User
+
+BATCH_SIZE = 1000
+BACKFILL = 100
+
+
+def bulk_insert(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == BATCH_SIZE:
+            FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    FeedEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_large_author(author_id):
+    return User.objects.filter(
+        pk=author_id, subscribers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).exists()
+
+
+def fan_out(recipe_id):
+    """Кладёт новый рецепт в ленты подписчиков автора.
+
+    Рецепты авторов с числом подписчиков больше FEED_FANOUT_LIMIT не
+    раскладываются: их подтягивает pull_large_authors при чтении ленты.
+    """
+    recipe = (
+        Recipe.objects.filter(pk=recipe_id)
+        .values("author_id", "created_at").first()
+    )
+    if recipe is None or is_large_author(recipe["author_id"]):
+        return
+    bulk_insert(
+        FeedEntry(
+            user_id=user,
+            recipe_id=recipe_id,
+            author_id=recipe["author_id"],
+            created_at=recipe["created_at"],
+        )
+        for user in Subscription.objects.filter(author=recipe["author_id"])
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+
+
+def entries_from(user_id, recipes):
+    return (
+        FeedEntry(
+            user_id=user_id,
+            recipe_id=pk,
+            author_id=author,
+            created_at=created_at,
+        )
+        for pk, author, created_at in recipes.order_by(
+            "-created_at", "-id"
+        ).values_list("pk", "author_id", "created_at")[:BACKFILL]
+    )
+
+
+def backfill(user_id, author_id):
+    """Последние BACKFILL рецептов автора в ленту нового подписчика."""
+    bulk_insert(entries_from(
+        user_id, Recipe.objects.filter(author=author_id)
+    ))
+
+
+def remove_author(user_id, author_id):
+    remove_authors(user_id, [author_id])
+
+
+def remove_authors(user_id, author_ids):
+    FeedEntry.objects.filter(user=user_id, author__in=author_ids).delete()
+
+
+def pull_large_authors(user):
+    """Дописывает в ленту свежие рецепты авторов без раскладки.
+
+    Для каждого такого автора из подписок берутся рецепты не старше
+    последнего уже попавшего в ленту, так что чтение остаётся
+    индексным запросом по (author, created_at).
+    """
+    authors = list(
+        Subscription.objects.filter(
+            user=user,
+            author__subscribers_count__gt=settings.FEED_FANOUT_LIMIT,
+        ).values_list("author_id", flat=True)
+    )
+    if not authors:
+        return
+    latest = dict(
+        FeedEntry.objects.filter(user=user, author__in=authors)
+        .order_by()
+        .values("author")
+        .annotate(latest=Max("created_at"))
+        .values_list("author", "latest")
+    )
+    condition = Q()
+    for author in authors:
+        if author in latest:
+            condition |= Q(author=author, created_at__gte=latest[author])
+        else:
+            condition |= Q(author=author)
+    bulk_insert(entries_from(user.pk, Recipe.objects.filter(condition)))
+
+
+def rebuild_feed(user_id):
+    with transaction.atomic():
+        FeedEntry.objects.filter(user=user_id).delete()
+        for author in Subscription.objects.filter(
+            user=user_id
+        ).values_list("author_id", flat=True):
+            backfill(user_id, author)
+
+
+def schedule_fan_out(recipe_id):
+    transaction.on_commit(lambda: fan_out(recipe_id))
+
+
+def schedule_backfill(user_id, author_id):
+    transaction.on_commit(lambda: backfill(user_id, author_id))
@@ -0,0 +1,150 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile, File
+from django.db import connections, transaction
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+Image.MAX_IMAGE_PIXELS = settings.IMAGE_MAX_PIXELS
+
+CHUNK_SIZE = 64 * 1024
+IMAGE_EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+
+executor = ThreadPoolExecutor(
+    max_workers=max(settings.IMAGE_WORKERS, 1),
+    thread_name_prefix="recipe-images",
+)
+
+
+def schedule_variants(recipe):
+    """Ставит построение уменьшенных копий в очередь после коммита."""
+    def submit():
+        if settings.IMAGE_WORKERS:
+            executor.submit(build_variants_in_worker, recipe.pk)
+        else:
+            build_variants(recipe.pk)
+    transaction.on_commit(submit)
+
+
+def resize(image, width):
+    if image.width <= width:
+        return image.copy()
+    height = max(round(image.height * width / image.width), 1)
+    return image.resize((width, height), Image.LANCZOS)
+
+
+def build_variants_in_worker(recipe_id):
+    try:
+        build_variants(recipe_id)
+    finally:
+        connections.close_all()
+
+
+def build_variants(recipe_id):
+    """WebP-копии картинки рецепта под ширины IMAGE_VARIANT_WIDTHS."""
+    from .models import Recipe
+
+    try:
+        recipe = Recipe.objects.filter(pk=recipe_id).first()
+        if recipe is None or not recipe.image:
+            return
+        source = recipe.image.name
+        storage = recipe.image.storage
+        stem = os.path.splitext(os.path.basename(source))[0]
+        variants = {"source": source}
+        with recipe.image.open("rb"), Image.open(recipe.image) as image:
+            image.draft("RGB", (max(settings.IMAGE_VARIANT_WIDTHS),) * 2)
+            image = ImageOps.exif_transpose(image)
+            if image.mode not in ("RGB", "RGBA"):
+                image = image.convert("RGBA" if "A" in image.mode else "RGB")
+            for width in settings.IMAGE_VARIANT_WIDTHS:
+                buffer = io.BytesIO()
+                resize(image, width).save(buffer, "WEBP", quality=80)
+                variants[str(width)] = storage.save(
+                    f"recipe/variants/{stem}_{width}.webp",
+                    ContentFile(buffer.getvalue()),
+                )
+        with transaction.atomic():
+            current = (
+                Recipe.objects.select_for_update()
+                .filter(pk=recipe_id, image=source)
+                .first()
+            )
+            if current is None:
+                delete_variants(storage, variants)
+                return
+            delete_variants(storage, current.image_variants)
+            current.image_variants = variants
+            current.save(update_fields=["image_variants"])
+    except Exception:
+        logger.exception("Не удалось обработать картинку рецепта %s",
+                         recipe_id)
+
+
+def delete_variants(storage, variants):
+    for key, name in variants.items():
+        if key != "source":
+            storage.delete(name)
+
+
+def spool_upload(chunks):
+    """Пишет поток во временный файл, попутно считая sha256 и размер."""
+    file = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in chunks:
+        size += len(chunk)
+        if size > settings.IMAGE_MAX_UPLOAD_SIZE:
+            file.close()
+            raise ValidationError(
+                "Картинка больше "
+                f"{settings.IMAGE_MAX_UPLOAD_SIZE // (1024 * 1024)} МБ"
+            )
+        digest.update(chunk)
+        file.write(chunk)
+    file.seek(0)
+    return file, digest.hexdigest(), size
+
+
+def inspect_image(file):
+    """Расширение картинки по заголовку, пиксели не декодируются."""
+    try:
+        with Image.open(file) as image:
+            extension = IMAGE_EXTENSIONS.get(image.format)
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError):
+        extension = None
+    finally:
+        file.seek(0)
+    if extension is None:
+        raise ValidationError("Загрузите картинку в формате JPEG, PNG, "
+                              "GIF или WebP")
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise ValidationError("Слишком большое разрешение картинки")
+    return extension
+
+
+def store_image(chunks):
+    """Сохраняет картинку под именем из её sha256.
+
+    Одинаковые файлы хранятся один раз.
+    """
+    from .models import Recipe
+
+    field = Recipe._meta.get_field("image")
+    file, digest, _ = spool_upload(chunks)
+    with file:
+        name = f"{field.upload_to}{digest}.{inspect_image(file)}"
+        if not field.storage.exists(name):
+            name = field.storage.save(name, File(file))
+    return name
@@ -0,0 +1,262 @@
+import json
+import random
+import statistics
+import subprocess
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from api.middleware import QueryTracker
+from recipes.models import (Favourite, Ingredient, IngredientsInRecipe,
+                            Recipe, ShoppingCart, Subscription, Tag)
+from users.models import CustomUser
+
+DATASET = {
+    "users": CustomUser,
+    "recipes": Recipe,
+    "ingredients": Ingredient,
+    "ingredients_in_recipe": IngredientsInRecipe,
+    "favourites": Favourite,
+    "carts": ShoppingCart,
+    "subscriptions": Subscription,
+}
+
+
+def git_commit():
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, cwd=settings.BASE_DIR,
+        )
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def summarize(latencies, queries, errors):
+    if len(latencies) > 1:
+        cuts = statistics.quantiles(latencies, n=100, method="inclusive")
+    else:
+        cuts = latencies * 99
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "queries_mean": round(statistics.fmean(queries), 2),
+        "queries_max": max(queries),
+        "throughput_rps": round(len(latencies) / sum(latencies), 1),
+    }
+
+
+class Command(BaseCommand):
+    help = ("Гоняет эндпоинты API через тестовый клиент Django и сохраняет "
+            "p50/p95/p99, число SQL-запросов и пропускную способность "
+            "в JSON для сравнения между коммитами.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--warmup", type=int, default=10)
+        parser.add_argument("--only", nargs="+", metavar="SCENARIO")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", default="benchmark.json")
+        parser.add_argument("--compare", metavar="JSON",
+                            help="Предыдущий результат для сравнения")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.prepare()
+        scenarios = {
+            name[len("scenario_"):]: getattr(self, name)
+            for name in sorted(dir(self)) if name.startswith("scenario_")
+        }
+        only = options["only"] or list(scenarios)
+        unknown = set(only) - scenarios.keys()
+        if unknown:
+            raise CommandError(
+                f"Неизвестные сценарии: {', '.join(sorted(unknown))}"
+            )
+        results = {}
+        for name in only:
+            for _ in range(options["warmup"]):
+                for method, path in scenarios[name]():
+                    self.measure(method, path)
+            samples = {}
+            for _ in range(options["requests"]):
+                for step, (method, path) in enumerate(scenarios[name]()):
+                    key = name if step == 0 else f"{name}_undo"
+                    samples.setdefault(key, ([], [], [0]))
+                    latency, queries, status = self.measure(method, path)
+                    samples[key][0].append(latency)
+                    samples[key][1].append(queries)
+                    samples[key][2][0] += status >= 400
+            for key, (latencies, queries, errors) in samples.items():
+                results[key] = summarize(latencies, queries, errors[0])
+                self.report(key, results[key])
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "commit": git_commit(),
+            "database": connection.vendor,
+            "requests": options["requests"],
+            "seed": options["seed"],
+            "dataset": {
+                name: model.objects.count() for name, model in DATASET.items()
+            },
+            "endpoints": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Результат сохранён в {options['output']}"
+        ))
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def prepare(self):
+        user = (
+            CustomUser.objects.annotate(total=Count("favourites"))
+            .order_by("-total", "id").first()
+        )
+        if user is None or not Recipe.objects.exists():
+            raise CommandError(
+                "Нет данных, сначала запустите seed_synthetic"
+            )
+        token, _ = Token.objects.get_or_create(user=user)
+        self.client = Client(
+            HTTP_AUTHORIZATION=f"Token {token.key}",
+            raise_request_exception=False,
+        )
+        self.user = user
+        self.recipes = list(
+            Recipe.objects.order_by("-id").values_list("id", flat=True)[:5000]
+        )
+        self.free_recipes = list(
+            Recipe.objects.exclude(favourites__user=user)
+            .exclude(carts__user=user)
+            .order_by("-id").values_list("id", flat=True)[:1000]
+        )
+        self.authors = list(
+            CustomUser.objects.exclude(pk=user.pk)
+            .exclude(following__user=user)
+            .order_by("-recipes_count").values_list("id", flat=True)[:1000]
+        )
+        self.ingredients = list(
+            Ingredient.objects.order_by("id").values_list("id", "name")[:5000]
+        )
+        self.tags = list(Tag.objects.values_list("id", "slug"))
+        self.all_tags = "&".join(f"tags={slug}" for _, slug in self.tags)
+
+    def measure(self, method, path):
+        tracker = QueryTracker()
+        started = time.perf_counter()
+        with connection.execute_wrapper(tracker):
+            response = getattr(self.client, method)(path)
+            if response.streaming:
+                b"".join(response.streaming_content)
+        return (
+            time.perf_counter() - started, tracker.count, response.status_code
+        )
+
+    def report(self, name, result):
+        self.stdout.write(
+            f"{name:<28} p50 {result['p50_ms']:>8.2f} мс  "
+            f"p95 {result['p95_ms']:>8.2f} мс  "
+            f"p99 {result['p99_ms']:>8.2f} мс  "
+            f"SQL {result['queries_mean']:>6.1f}  "
+            f"{result['throughput_rps']:>7.1f} rps  "
+            f"ошибок {result['errors']}"
+        )
+
+    def compare(self, path, results):
+        with open(path, encoding="utf-8") as file:
+            previous = json.load(file)
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"Сравнение с {previous.get('commit')} ({path})"
+        ))
+        for name, result in results.items():
+            before = previous["endpoints"].get(name)
+            if before is None:
+                continue
+            change = (result["p95_ms"] - before["p95_ms"]) / (
+                before["p95_ms"] or 1
+            )
+            line = (
+                f"{name:<28} p95 {before['p95_ms']:.2f} -> "
+                f"{result['p95_ms']:.2f} мс ({change:+.0%}), SQL "
+                f"{before['queries_mean']} -> {result['queries_mean']}"
+            )
+            if change > 0.1 or result["queries_mean"] > before["queries_mean"]:
+                line = self.style.ERROR(line)
+            self.stdout.write(line)
+
+    def recipe(self):
+        return self.random.choice(self.recipes)
+
+    def scenario_recipes_list(self):
+        page = self.random.randint(1, 5)
+        return [("get", f"/api/recipes/?{self.all_tags}&page={page}")]
+
+    def scenario_recipes_cursor(self):
+        return [("get", f"/api/recipes/?{self.all_tags}&cursor=&limit=10")]
+
+    def scenario_recipes_by_tag(self):
+        slug = self.random.choice(self.tags)[1]
+        return [("get", f"/api/recipes/?tags={slug}")]
+
+    def scenario_recipe_detail(self):
+        return [("get", f"/api/recipes/{self.recipe()}/")]
+
+    def scenario_favourites(self):
+        return [("get", "/api/favourites/")]
+
+    def scenario_subscriptions(self):
+        return [("get", "/api/subscriptions/?recipes_limit=3")]
+
+    def scenario_feed(self):
+        return [("get", "/api/feed/?limit=10")]
+
+    def scenario_download_shopping_cart(self):
+        return [("get", "/api/recipes/download_shopping_cart/")]
+
+    def scenario_shopping_list(self):
+        return [("get", "/api/recipes/shopping_list/")]
+
+    def scenario_recommended(self):
+        return [("get", "/api/recipes/recommended/")]
+
+    def scenario_ingredient_search(self):
+        name = self.random.choice(self.ingredients)[1]
+        return [("get", f"/api/ingredient/?name={name[:2]}")]
+
+    def scenario_ingredient_detail(self):
+        pk = self.random.choice(self.ingredients)[0]
+        return [("get", f"/api/ingredient/{pk}/")]
+
+    def scenario_tags(self):
+        return [("get", "/api/tags/")]
+
+    def scenario_tag_detail(self):
+        return [("get", f"/api/tags/{self.random.choice(self.tags)[0]}/")]
+
+    def scenario_favourite(self):
+        recipe = self.random.choice(self.free_recipes)
+        path = f"/api/recipes/{recipe}/favorite/"
+        return [("post", path), ("delete", path)]
+
+    def scenario_shopping_cart(self):
+        recipe = self.random.choice(self.free_recipes)
+        path = f"/api/recipes/{recipe}/shopping_cart/"
+        return [("post", path), ("delete", path)]
+
+    def scenario_subscribe(self):
+        path = f"/api/users/{self.random.choice(self.authors)}/subscribe/"
+        return [("post", path), ("delete", path)]
@@ -0,0 +1,133 @@
+import json
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import cycle
+from threading import Lock
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from recipes.models import Tag
+
+from .benchmark import git_commit, summarize
+
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Command(BaseCommand):
+    help = ("Параллельная нагрузка на запущенные серверы, например WSGI и "
+            "ASGI-развёртывание: задержки и пропускная способность при "
+            "разном числе одновременных клиентов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", metavar="URL",
+                            help="Адреса серверов, например "
+                                 "http://localhost:8007")
+        parser.add_argument("--concurrency", type=int, nargs="+",
+                            default=[1, 8, 32, 64])
+        parser.add_argument("--requests", type=int, default=500)
+        parser.add_argument("--paths", nargs="+")
+        parser.add_argument("--token", help="Токен для авторизации")
+        parser.add_argument("--timeout", type=float, default=30)
+        parser.add_argument("--output", default="concurrency.json")
+
+    def handle(self, *args, **options):
+        if min(options["concurrency"]) < 1:
+            raise CommandError("Число клиентов должно быть больше нуля")
+        options["paths"] = options["paths"] or self.default_paths()
+        self.options = options
+        results = {}
+        for url in options["urls"]:
+            results[url] = {}
+            for clients in options["concurrency"]:
+                result = self.run(url.rstrip("/"), clients)
+                results[url][clients] = result
+                self.report(url, clients, result)
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "commit": git_commit(),
+            "requests": options["requests"],
+            "paths": list(options["paths"]),
+            "servers": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as file:
+            json.dump(report, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(
+            f"Результат сохранён в {options['output']}"
+        ))
+
+    def default_paths(self):
+        tags = "&".join(
+            f"tags={slug}"
+            for slug in Tag.objects.values_list("slug", flat=True)
+        )
+        return [
+            f"/api/recipes/?{tags}",
+            f"/api/recipes/?{tags}&cursor=",
+            "/api/tags/",
+            f"/api/ingredient/?name={quote('мо')}",
+            f"/api/favourites/?{tags}",
+            "/api/subscriptions/",
+        ]
+
+    def fetch(self, url):
+        headers = {"Accept-Encoding": "gzip"}
+        if self.options["token"]:
+            headers["Authorization"] = f"Token {self.options['token']}"
+        started = time.perf_counter()
+        try:
+            with urlopen(
+                Request(url, headers=headers), timeout=self.options["timeout"]
+            ) as response:
+                response.read()
+                status = response.status
+                timing = response.headers.get("Server-Timing", "")
+        except HTTPError as error:
+            status, timing = error.code, ""
+        except URLError:
+            status, timing = 599, ""
+        match = QUERIES.search(timing)
+        return (
+            time.perf_counter() - started,
+            int(match.group(1)) if match else 0,
+            status,
+        )
+
+    def run(self, base, clients):
+        for path in self.options["paths"]:
+            self.fetch(base + path)
+        paths = cycle(self.options["paths"])
+        lock = Lock()
+
+        def next_url():
+            with lock:
+                return base + next(paths)
+
+        with ThreadPoolExecutor(clients) as pool:
+            started = time.perf_counter()
+            samples = list(pool.map(
+                lambda _: self.fetch(next_url()),
+                range(self.options["requests"]),
+            ))
+            elapsed = time.perf_counter() - started
+        latencies, queries, statuses = zip(*samples)
+        result = summarize(
+            list(latencies), list(queries),
+            sum(status >= 400 for status in statuses),
+        )
+        result["throughput_rps"] = round(len(samples) / elapsed, 1)
+        return result
+
+    def report(self, url, clients, result):
+        self.stdout.write(
+            f"{url:<28} клиентов {clients:>3}  "
+            f"p50 {result['p50_ms']:>8.2f} мс  "
+            f"p95 {result['p95_ms']:>8.2f} мс  "
+            f"p99 {result['p99_ms']:>8.2f} мс  "
+            f"{result['throughput_rps']:>7.1f} rps  "
+            f"ошибок {result['errors']}"
+        )
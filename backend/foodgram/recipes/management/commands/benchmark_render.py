@@ -0,0 +1,85 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from api.querysets import recipe_feed, recipe_previews
+from api.renderers import FastJSONRenderer
+from api.representations import recipe_representations
+from api.serializers import FavouriteSerializer, RecipeGetSerializer
+from recipes.models import Recipe
+
+
+def by_id(items):
+    return sorted(items, key=lambda item: item["id"])
+
+
+class Command(BaseCommand):
+    help = ("Стоимость сериализации одного рецепта: сериализаторы DRF с "
+            "JSONRenderer против сборки словарей из values_list с "
+            "FastJSONRenderer. Проверяет, что ответы совпадают байт в байт.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=500)
+        parser.add_argument("--repeat", type=int, default=5)
+
+    def handle(self, *args, **options):
+        pks = list(
+            Recipe.objects.order_by("-id")
+            .values_list("id", flat=True)[:options["recipes"]]
+        )
+        if not pks:
+            raise CommandError(
+                "Нет рецептов, сначала запустите seed_synthetic"
+            )
+        authors = list(
+            Recipe.objects.filter(pk__in=pks).order_by()
+            .values_list("author_id", flat=True).distinct()
+        )
+        self.measure(
+            "Рецепты", len(pks), options["repeat"],
+            lambda: JSONRenderer().render(by_id(
+                RecipeGetSerializer(
+                    recipe_feed(None, Recipe.objects.filter(pk__in=pks)),
+                    many=True,
+                ).data
+            )),
+            lambda: FastJSONRenderer().render(
+                by_id(recipe_representations(pks))
+            ),
+        )
+        selected = set(pks)
+        self.measure(
+            "Превью", len(pks), options["repeat"],
+            lambda: JSONRenderer().render(by_id(
+                FavouriteSerializer(
+                    Recipe.objects.filter(pk__in=pks), many=True
+                ).data
+            )),
+            lambda: FastJSONRenderer().render(by_id(
+                preview
+                for previews in recipe_previews(authors).values()
+                for preview in previews
+                if preview["id"] in selected
+            )),
+        )
+
+    def timed(self, render, repeat):
+        best = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            body = render()
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        return best, body
+
+    def measure(self, name, count, repeat, before, after):
+        before_time, before_body = self.timed(before, repeat)
+        after_time, after_body = self.timed(after, repeat)
+        if before_body != after_body:
+            raise CommandError(f"{name}: ответы различаются")
+        self.stdout.write(
+            f"{name:<10} {before_time / count * 1e6:>8.1f} мкс -> "
+            f"{after_time / count * 1e6:>8.1f} мкс на рецепт "
+            f"(x{before_time / after_time:.1f}), {len(after_body)} байт"
+        )
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.recommendations import NEIGHBOURS, build_neighbours
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает похожие рецепты для /api/recipes/recommended/ "
+            "по истории избранного и корзин, составу и тегам.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--neighbours", type=int, default=NEIGHBOURS,
+                            help="сколько похожих рецептов хранить")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        created = build_neighbours(options["neighbours"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Сохранено пар: {created} "
+            f"за {time.monotonic() - started:.2f} с"
+        ))
@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Favourite, Recipe
+from users.models import CustomUser
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Планы запросов избранного и ленты автора с новыми индексами "
+            "и без них на синтетических данных. Все изменения откатываются.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--favourites", type=int, default=1_000_000)
+        parser.add_argument("--users", type=int, default=10_000)
+        parser.add_argument("--recipes", type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Команда работает только с PostgreSQL")
+        if options["favourites"] > options["users"] * options["recipes"]:
+            raise CommandError("Слишком мало пользователей и рецептов")
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    self.seed(cursor, options)
+                    self.explain("С индексами")
+                    self.drop_indexes(cursor)
+                    self.explain("Без индексов")
+                raise Rollback
+        except Rollback:
+            pass
+
+    def seed(self, cursor, options):
+        users = CustomUser._meta.db_table
+        recipes = Recipe._meta.db_table
+        favourites = Favourite._meta.db_table
+        cursor.execute(
+            f"INSERT INTO {users} (password, is_superuser, username, "
+            "first_name, last_name, email, is_staff, is_active, date_joined) "
+            "SELECT '', false, 'bench_' || g, 'bench', 'bench', "
+            "'bench_' || g || '@bench.local', false, true, now() "
+            "FROM generate_series(1, %s) g",
+            [options["users"]],
+        )
+        cursor.execute(
+            f"INSERT INTO {recipes} (author_id, name, text, cooking_time, "
+            "image, created_at) "
+            "SELECT u.ids[1 + g %% cardinality(u.ids)], 'bench ' || g, '', "
+            "1, '', now() - g * interval '1 minute' "
+            f"FROM (SELECT array_agg(id) ids FROM {users} "
+            "WHERE username LIKE 'bench\\_%%') u, generate_series(1, %s) g",
+            [options["recipes"]],
+        )
+        cursor.execute(
+            f"INSERT INTO {favourites} (user_id, recipe_id) "
+            "SELECT u.ids[1 + g %% cardinality(u.ids)], "
+            "r.ids[1 + (g / cardinality(u.ids)) %% cardinality(r.ids)] "
+            f"FROM (SELECT array_agg(id) ids FROM {users} "
+            "WHERE username LIKE 'bench\\_%%') u, "
+            f"(SELECT array_agg(id) ids FROM {recipes} "
+            "WHERE name LIKE 'bench %%') r, "
+            "generate_series(0, %s - 1) g",
+            [options["favourites"]],
+        )
+        cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        for table in (users, recipes, favourites):
+            cursor.execute(f"ANALYZE {table}")
+        self.stdout.write(f"Добавлено избранного: {options['favourites']}")
+
+    def drop_indexes(self, cursor):
+        cursor.execute(
+            f"ALTER TABLE {Favourite._meta.db_table} "
+            "DROP CONSTRAINT unique_favourite"
+        )
+        table = Recipe._meta.db_table
+        constraints = connection.introspection.get_constraints(cursor, table)
+        for name, info in constraints.items():
+            if info["index"] and "created_at" in info["columns"]:
+                cursor.execute(f"DROP INDEX {name}")
+
+    def explain(self, title):
+        favourite = Favourite.objects.order_by("-id").first()
+        queries = {
+            "Проверка избранного": Favourite.objects.filter(
+                user=favourite.user_id, recipe=favourite.recipe_id
+            ).order_by()[:1],
+            "Последние рецепты автора": Recipe.objects.filter(
+                author=favourite.recipe.author_id
+            ).order_by("-created_at")[:10],
+        }
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        for name, queryset in queries.items():
+            self.stdout.write(self.style.SUCCESS(name))
+            self.stdout.write(queryset.explain(analyze=True))
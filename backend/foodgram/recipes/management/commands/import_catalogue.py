@@ -0,0 +1,155 @@
+import csv
+import gzip
+import io
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.cache import bump_version
+from api.versions import bump_table
+from recipes.models import Ingredient, Tag
+
+CATALOGUES = {
+    "ingredients": {
+        "model": Ingredient,
+        "fields": ("name", "measurement_unit"),
+        "key": ("name", "measurement_unit"),
+        "file": "ingredients.csv",
+    },
+    "tags": {
+        "model": Tag,
+        "fields": ("name", "color", "slug"),
+        "key": ("slug",),
+        "file": "tag.csv",
+    },
+}
+
+
+def open_csv(path):
+    with open(path, "rb") as file:
+        is_gzip = file.read(2) == b"\x1f\x8b"
+    if is_gzip:
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+class Command(BaseCommand):
+    help = ("Загружает справочник ингредиентов или тегов из CSV "
+            "(в том числе .gz) пачками с обновлением существующих строк.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("catalogue", choices=sorted(CATALOGUES))
+        parser.add_argument("path", nargs="?")
+        parser.add_argument("--chunk-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        catalogue = CATALOGUES[options["catalogue"]]
+        path = options["path"] or os.path.join(
+            settings.SCV_DATA[0], "data", catalogue["file"]
+        )
+        if not os.path.exists(path):
+            raise CommandError(f"Файл {path} не найден")
+        if connection.vendor == "postgresql":
+            load = self.load_copy
+        else:
+            load = self.load_bulk
+
+        started = time.monotonic()
+        self.skipped = 0
+        total = 0
+        with open_csv(path) as csv_file, transaction.atomic():
+            for chunk in self.read_chunks(
+                csv_file, catalogue, options["chunk_size"]
+            ):
+                load(catalogue, chunk)
+                total += len(chunk)
+                elapsed = time.monotonic() - started
+                self.stdout.write(
+                    f"Обработано {total} строк, "
+                    f"{total / elapsed if elapsed else total:.0f} строк/с"
+                )
+        bump_table(catalogue["model"])
+        bump_version()
+        self.stdout.write(self.style.SUCCESS(
+            f"Загружено {total} уникальных строк из {path} "
+            f"за {time.monotonic() - started:.2f} с, "
+            f"пропущено {self.skipped}"
+        ))
+
+    def read_chunks(self, csv_file, catalogue, chunk_size):
+        """Пачки строк, уникальных по ключу справочника."""
+        fields = catalogue["fields"]
+        key = [fields.index(name) for name in catalogue["key"]]
+        seen = set()
+        chunk = []
+        for row in csv.reader(csv_file):
+            row = tuple(value.strip() for value in row)
+            if len(row) != len(fields) or not all(row):
+                self.skipped += 1
+                continue
+            row_key = tuple(row[index] for index in key)
+            if row_key in seen:
+                self.skipped += 1
+                continue
+            seen.add(row_key)
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def load_copy(self, catalogue, chunk):
+        """COPY во временную таблицу и INSERT ... ON CONFLICT."""
+        table = catalogue["model"]._meta.db_table
+        fields = catalogue["fields"]
+        columns = ", ".join(fields)
+        updates = [name for name in fields if name not in catalogue["key"]]
+        if updates:
+            conflict = "DO UPDATE SET " + ", ".join(
+                f"{name} = EXCLUDED.{name}" for name in updates
+            )
+        else:
+            conflict = "DO NOTHING"
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(chunk)
+        buffer.seek(0)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE IF NOT EXISTS import_{table} "
+                f"ON COMMIT DROP AS SELECT {columns} FROM {table} "
+                "WITH NO DATA"
+            )
+            cursor.execute(f"TRUNCATE import_{table}")
+            cursor.copy_expert(
+                f"COPY import_{table} ({columns}) FROM STDIN WITH CSV",
+                buffer,
+            )
+            cursor.execute(
+                f"INSERT INTO {table} ({columns}) "
+                f"SELECT {columns} FROM import_{table} "
+                f"ON CONFLICT ({', '.join(catalogue['key'])}) {conflict}"
+            )
+
+    def load_bulk(self, catalogue, chunk):
+        """bulk_update для существующих строк и bulk_create для новых."""
+        model = catalogue["model"]
+        fields = catalogue["fields"]
+        objects = [model(**dict(zip(fields, row))) for row in chunk]
+        updates = [name for name in fields if name not in catalogue["key"]]
+        lookup = "__".join(catalogue["key"])
+        if len(catalogue["key"]) == 1 and updates:
+            existing = model.objects.in_bulk(
+                [getattr(obj, lookup) for obj in objects], field_name=lookup
+            )
+            for obj in objects:
+                if getattr(obj, lookup) in existing:
+                    obj.pk = existing[getattr(obj, lookup)].pk
+            model.objects.bulk_update(
+                [obj for obj in objects if obj.pk], updates
+            )
+            objects = [obj for obj in objects if not obj.pk]
+        model.objects.bulk_create(objects, ignore_conflicts=True)
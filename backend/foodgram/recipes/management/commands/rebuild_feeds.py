@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.feed import rebuild_feed
+from recipes.models import Subscription
+
+
+class Command(BaseCommand):
+    help = ("Пересобирает ленты подписок из последних рецептов авторов, "
+            "на которых подписан пользователь.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("users", nargs="*", type=int,
+                            help="id пользователей, по умолчанию все")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = set(options["users"]) or set(
+            Subscription.objects.values_list("user_id", flat=True)
+        )
+        for user in users:
+            rebuild_feed(user)
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересобрано лент: {len(users)} "
+            f"за {time.monotonic() - started:.2f} с"
+        ))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.models import ShoppingCart, ShoppingListItem
+from recipes.shopping_list import refresh_shopping_lists
+
+
+class Command(BaseCommand):
+    help = ("Пересобирает сводные списки покупок из корзин пачками "
+            "пользователей.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("users", nargs="*", type=int,
+                            help="id пользователей, по умолчанию все")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        users = set(options["users"])
+        if not users:
+            users = set(
+                ShoppingCart.objects.values_list("user_id", flat=True)
+            )
+            users.update(
+                ShoppingListItem.objects.values_list("user_id", flat=True)
+            )
+        refresh_shopping_lists(users)
+        self.stdout.write(self.style.SUCCESS(
+            f"Пересобрано списков: {len(users)}, строк: "
+            f"{ShoppingListItem.objects.filter(user__in=users).count()} "
+            f"за {time.monotonic() - started:.2f} с"
+        ))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F
+
+from recipes.batch import count_by
+from recipes.models import Favourite, Recipe, ShoppingCart, Subscription
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики рецептов и авторов."
+
+    counters = (
+        (Recipe, "favourites_count", Favourite, "recipe"),
+        (Recipe, "carts_count", ShoppingCart, "recipe"),
+        (CustomUser, "recipes_count", Recipe, "author"),
+        (CustomUser, "subscribers_count", Subscription, "author"),
+    )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, counter, source, field in self.counters:
+                actual = count_by(source, field)
+                drifted = (
+                    model.objects.annotate(actual=actual)
+                    .exclude(**{counter: F("actual")})
+                    .values("pk")
+                )
+                updated = model.objects.filter(pk__in=drifted).update(
+                    **{counter: actual}
+                )
+                self.stdout.write(
+                    f"{model._meta.label}.{counter}: исправлено {updated}"
+                )
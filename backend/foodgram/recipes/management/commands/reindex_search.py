@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import Recipe
+from recipes.search import update_search_index
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает поисковый индекс всех рецептов пачками."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        pks = list(Recipe.objects.order_by("pk").values_list("pk", flat=True))
+        size = options["batch_size"]
+        for start in range(0, len(pks), size):
+            update_search_index(pks[start:start + size])
+            self.stdout.write(
+                f"Обработано {min(start + size, len(pks))} из {len(pks)}"
+            )
@@ -0,0 +1,201 @@
+import base64
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from recipes.models import (Favourite, Ingredient, IngredientsInRecipe,
+                            Recipe, ShoppingCart, Subscription, Tag)
+from users.models import CustomUser
+
+PLACEHOLDER = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAIAAACQd1PeAAAADElEQVR4nGP4z8AAAAMBAQDJ"
+    "/pLvAAAAAElFTkSuQmCC"
+)
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса: несколько популярных объектов и длинный хвост."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+class Command(BaseCommand):
+    help = ("Заполняет базу синтетическими пользователями, рецептами, "
+            "избранным, корзинами и подписками для нагрузочных замеров.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes", type=int, default=10_000)
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--favourites", type=int, default=50_000)
+        parser.add_argument("--carts", type=int, default=5000)
+        parser.add_argument("--subscriptions", type=int, default=10_000)
+        parser.add_argument("--skew", type=float, default=1.1,
+                            help="Показатель распределения Ципфа")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--prefix", default="synthetic")
+        parser.add_argument("--flush", action="store_true",
+                            help="Удалить ранее созданные данные с префиксом")
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.skew = options["skew"]
+        prefix = options["prefix"]
+        seeded = CustomUser.objects.filter(username__startswith=f"{prefix}_")
+        if options["flush"]:
+            deleted, _ = seeded.delete()
+            self.stdout.write(f"Удалено объектов: {deleted}")
+        elif seeded.exists():
+            raise CommandError(
+                f"Данные с префиксом {prefix} уже есть, используйте --flush"
+            )
+        ingredients = list(Ingredient.objects.values_list("id", flat=True))
+        tags = list(Tag.objects.values_list("id", flat=True))
+        if not ingredients or not tags:
+            raise CommandError(
+                "Сначала загрузите справочники командой import_catalogue"
+            )
+        if options["users"] < 2:
+            raise CommandError("Нужно хотя бы два пользователя")
+
+        started = time.monotonic()
+        with transaction.atomic():
+            users = self.create_users(prefix, options["users"])
+            recipes = self.create_recipes(prefix, users, options["recipes"])
+            self.create_recipe_links(
+                recipes, ingredients, tags,
+                options["ingredients_per_recipe"],
+            )
+            self.create_pairs(
+                Favourite, "user", users, "recipe", recipes,
+                options["favourites"],
+            )
+            self.create_pairs(
+                ShoppingCart, "user", users, "recipe", recipes,
+                options["carts"],
+            )
+            self.create_pairs(
+                Subscription, "user", users, "author", users,
+                options["subscriptions"],
+            )
+            call_command("recount", stdout=self.stdout)
+            call_command(
+                "rebuild_shopping_lists", *users, stdout=self.stdout
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово за {time.monotonic() - started:.1f} с, "
+            f"seed={options['seed']}"
+        ))
+
+    def choose(self, population, weights, count):
+        return self.random.choices(population, cum_weights=weights, k=count)
+
+    def bulk_create(self, model, objects):
+        model.objects.bulk_create(
+            objects, batch_size=self.batch_size, ignore_conflicts=True
+        )
+        self.stdout.write(f"{model._meta.label}: {len(objects)}")
+
+    def create_users(self, prefix, count):
+        password = make_password(prefix)
+        self.bulk_create(CustomUser, [
+            CustomUser(
+                username=f"{prefix}_{number}",
+                email=f"{prefix}_{number}@example.com",
+                first_name="Synthetic",
+                last_name=str(number),
+                password=password,
+            )
+            for number in range(count)
+        ])
+        return list(
+            CustomUser.objects.filter(username__startswith=f"{prefix}_")
+            .order_by("id").values_list("id", flat=True)
+        )
+
+    def create_recipes(self, prefix, users, count):
+        image = f"recipe/{prefix}.png"
+        if not default_storage.exists(image):
+            image = default_storage.save(image, ContentFile(PLACEHOLDER))
+        now = timezone.now()
+        authors = self.choose(
+            users, zipf_weights(len(users), self.skew), count
+        )
+        self.bulk_create(Recipe, [
+            Recipe(
+                author_id=author,
+                name=f"{prefix} {number}",
+                text=f"Синтетический рецепт {number}",
+                cooking_time=self.random.randint(1, 120),
+                image=image,
+                created_at=now - timedelta(
+                    minutes=self.random.randint(0, 365 * 24 * 60)
+                ),
+            )
+            for number, author in enumerate(authors)
+        ])
+        return list(
+            Recipe.objects.filter(author__in=users)
+            .order_by("id").values_list("id", flat=True)
+        )
+
+    def create_recipe_links(self, recipes, ingredients, tags, average):
+        weights = zipf_weights(len(ingredients), self.skew)
+        links = []
+        recipe_tags = []
+        for recipe in recipes:
+            size = min(
+                len(ingredients),
+                max(1, round(self.random.triangular(1, average * 2, average))),
+            )
+            chosen = set()
+            while len(chosen) < size:
+                chosen.update(self.choose(ingredients, weights, size))
+            links.extend(
+                IngredientsInRecipe(
+                    recipe_id=recipe,
+                    ingredient_id=ingredient,
+                    amount=self.random.randint(1, 1000),
+                )
+                for ingredient in itertools.islice(chosen, size)
+            )
+            recipe_tags.extend(
+                Recipe.tags.through(recipe_id=recipe, tag_id=tag)
+                for tag in self.random.sample(
+                    tags, self.random.randint(1, min(3, len(tags)))
+                )
+            )
+        self.bulk_create(IngredientsInRecipe, links)
+        self.bulk_create(Recipe.tags.through, recipe_tags)
+
+    def create_pairs(self, model, left, lefts, right, rights, count):
+        """Уникальные пары с перекосом в сторону активных и популярных."""
+        count = min(count, len(lefts) * (len(rights) - 1))
+        left_weights = zipf_weights(len(lefts), self.skew)
+        right_weights = zipf_weights(len(rights), self.skew)
+        pairs = set()
+        while len(pairs) < count:
+            missing = count - len(pairs)
+            pairs.update(
+                pair for pair in zip(
+                    self.choose(lefts, left_weights, missing),
+                    self.choose(rights, right_weights, missing),
+                )
+                if pair[0] != pair[1] or model is not Subscription
+            )
+        self.bulk_create(model, [
+            model(**{f"{left}_id": first, f"{right}_id": second})
+            for first, second in pairs
+        ])
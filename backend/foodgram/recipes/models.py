@@ -1,7 +1,9 @@
 from colorfield.fields import ColorField
 from django.conf import settings
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from recipes import validators
 from users.models import CustomUser
@@ -51,6 +53,12 @@ class Ingredient(models.Model):
         verbose_name = "Ингредиент"
         verbose_name_plural = "Ингредиенты"
         ordering = ["name"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "measurement_unit"],
+                name="unique_ingredient",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -80,6 +88,12 @@ class Recipe(models.Model):
         verbose_name="Картинка",
         upload_to="recipe/",
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="Уменьшенные копии картинки",
+    )
     name = models.CharField(
         max_length=120,
         verbose_name="Название рецепта",
@@ -96,11 +110,38 @@ class Recipe(models.Model):
         ],
         verbose_name="Время приготовления рецепта",
     )
+    created_at = models.DateTimeField(
+        default=timezone.now,
+        editable=False,
+        db_index=True,
+        verbose_name="Дата публикации",
+    )
+    favourites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В избранном",
+    )
+    carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="В списках покупок",
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name="Поисковый вектор",
+    )
 
     class Meta:
         verbose_name = "Рецепт"
         verbose_name_plural = "Рецепты"
         ordering = ["name"]
+        indexes = [
+            models.Index(
+                fields=["author", "-created_at"],
+                name="recipe_author_created_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -126,6 +167,12 @@ class Favourite(models.Model):
         ordering = ["user"]
         verbose_name = "Рецепт в избранном"
         verbose_name_plural = "Рецепты в избранном"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_favourite",
+            ),
+        ]
 
     def __str__(self):
         return f"Рецепт {self.recipe} добавлен в избранное."
@@ -152,6 +199,12 @@ class IngredientsInRecipe(models.Model):
         ordering = ["-id"]
         verbose_name = "Ингредиент в рецепте"
         verbose_name_plural = "Ингредиенты в рецепте"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "ingredient"],
+                name="unique_ingredient_in_recipe",
+            ),
+        ]
 
     def __str__(self):
         return self.ingredient.name
@@ -177,6 +230,12 @@ class Subscription(models.Model):
         ordering = ["-id"]
         verbose_name = "Подписка"
         verbose_name_plural = "Подписки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"],
+                name="unique_subscription",
+            ),
+        ]
 
     def __str__(self):
         return f"Пользователь {self.user} подписался на автора {self.author}."
@@ -202,6 +261,163 @@ class ShoppingCart(models.Model):
         ordering = ["-id"]
         verbose_name = "Список покупок"
         verbose_name_plural = "Списки покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_shopping_cart",
+            ),
+        ]
 
     def __str__(self):
         return f"Рецепт {self.recipe} добавлен в список покупок."
+
+
+class ShoppingListItem(models.Model):
+    """Сводная строка списка покупок пользователя.
+
+    Сдвигается на разницу количеств при изменении корзины и рецептов
+    в ней, полностью собирается командой rebuild_shopping_lists.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        verbose_name="Пользователь",
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Ингредиент",
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name="Количество",
+    )
+
+    class Meta:
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Строки списков покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "ingredient"],
+                name="unique_shopping_list_item",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.ingredient} - {self.total_amount}"
+
+
+class FeedEntry(models.Model):
+    """Рецепт автора из подписок в ленте пользователя.
+
+    Строки раскладываются подписчикам при публикации рецепта, у авторов
+    с очень большим числом подписчиков подтягиваются при чтении ленты.
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="Пользователь",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Рецепт",
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Автор",
+    )
+    created_at = models.DateTimeField(
+        verbose_name="Дата публикации",
+    )
+
+    class Meta:
+        ordering = ["-created_at", "-id"]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_feed_entry",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-id"],
+                name="feed_user_created_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} в ленте {self.user}"
+
+
+class RecipeNeighbour(models.Model):
+    """Похожий рецепт для рекомендаций.
+
+    Заполняется командой build_recommendations: совместные добавления в
+    избранное и корзину, для рецептов без истории - общие ингредиенты
+    и теги.
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="neighbours",
+        verbose_name="Рецепт",
+    )
+    neighbour = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="+",
+        verbose_name="Похожий рецепт",
+    )
+    score = models.FloatField(
+        verbose_name="Сходство",
+    )
+
+    class Meta:
+        ordering = ["recipe", "-score"]
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "neighbour"],
+                name="unique_recipe_neighbour",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.recipe} -> {self.neighbour}"
+
+
+class TableVersion(models.Model):
+    """Версия таблицы справочника, общая для всех процессов.
+
+    Увеличивается при каждом изменении таблицы; по ней строятся ETag
+    ответов и сверяются снимки справочников в памяти процессов.
+    """
+
+    table = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Таблица",
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name="Версия",
+    )
+
+    class Meta:
+        verbose_name = "Версия таблицы"
+        verbose_name_plural = "Версии таблиц"
+
+    def __str__(self):
+        return f"{self.table}: {self.version}"
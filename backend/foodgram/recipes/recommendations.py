@@ -0,0 +1,201 @@
+import heapq
+import math
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from .models import (Favourite, IngredientsInRecipe, Recipe, RecipeNeighbour,
+                     ShoppingCart)
+
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 100
+NEIGHBOURS = 20
+MAX_HISTORY = 200
+# Рецепты ингредиента, с которыми сравнивается рецепт без истории.
+CONTENT_CANDIDATES = 30
+CONTENT_WEIGHT = 0.5
+TAG_WEIGHT = 0.25
+BATCH_SIZE = 5000
+CHUNK_SIZE = 10000
+SEEDS = 20
+SEED_DECAY = 0.9
+
+
+def user_histories():
+    """Последние рецепты из избранного и корзины каждого пользователя."""
+    histories = defaultdict(set)
+    for model in (Favourite, ShoppingCart):
+        taken = Counter()
+        rows = (
+            model.objects.order_by("user_id", "-id")
+            .values_list("user_id", "recipe_id")
+            .iterator(chunk_size=CHUNK_SIZE)
+        )
+        for user, recipe in rows:
+            if taken[user] < MAX_HISTORY:
+                taken[user] += 1
+                histories[user].add(recipe)
+    return histories
+
+
+def behaviour_neighbours(histories, top_k):
+    """Косинусная близость рецептов по пользователям, добавившим оба."""
+    users = defaultdict(list)
+    for user, recipes in histories.items():
+        for recipe in recipes:
+            users[recipe].append(user)
+    for recipe, recipe_users in users.items():
+        counts = Counter()
+        for user in recipe_users:
+            counts.update(histories[user])
+        del counts[recipe]
+        yield recipe, heapq.nlargest(
+            top_k,
+            (
+                (count / math.sqrt(len(recipe_users) * len(users[other])),
+                 other)
+                for other, count in counts.items()
+            ),
+        )
+
+
+def content_neighbours(recipes, top_k):
+    """Похожие по ингредиентам (с весом idf) и тегам рецепты.
+
+    Кандидаты - самые популярные рецепты с теми же ингредиентами, так что
+    на рецепт приходится не больше CONTENT_CANDIDATES сравнений
+    на ингредиент.
+    """
+    ingredients = defaultdict(list)
+    postings = defaultdict(list)
+    for recipe, ingredient in (
+        IngredientsInRecipe.objects.order_by()
+        .values_list("recipe_id", "ingredient_id")
+        .iterator(chunk_size=CHUNK_SIZE)
+    ):
+        ingredients[recipe].append(ingredient)
+        postings[ingredient].append(recipe)
+    tags = defaultdict(set)
+    for recipe, tag in (
+        Recipe.tags.through.objects.order_by()
+        .values_list("recipe_id", "tag_id")
+        .iterator(chunk_size=CHUNK_SIZE)
+    ):
+        tags[recipe].add(tag)
+    popularity = dict(
+        Recipe.objects.values_list("pk", "favourites_count")
+        .iterator(chunk_size=CHUNK_SIZE)
+    )
+    total = len(ingredients) or 1
+    idf = {
+        ingredient: math.log(total / len(posting))
+        for ingredient, posting in postings.items()
+    }
+    candidates = {
+        ingredient: heapq.nlargest(
+            CONTENT_CANDIDATES, posting,
+            key=lambda pk: (popularity.get(pk, 0), pk),
+        )
+        for ingredient, posting in postings.items()
+    }
+    del postings
+    for recipe in recipes:
+        weight = sum(idf[ingredient] for ingredient in ingredients[recipe])
+        if not weight:
+            continue
+        shared = defaultdict(float)
+        for ingredient in ingredients[recipe]:
+            for other in candidates[ingredient]:
+                shared[other] += idf[ingredient]
+        shared.pop(recipe, None)
+        scores = []
+        for other, value in shared.items():
+            union = len(tags[recipe] | tags[other])
+            tag_share = len(tags[recipe] & tags[other]) / union if union else 0
+            scores.append((
+                CONTENT_WEIGHT * (value / weight + TAG_WEIGHT * tag_share)
+                / (1 + TAG_WEIGHT),
+                other,
+            ))
+        yield recipe, heapq.nlargest(top_k, scores)
+
+
+def build_neighbours(top_k=NEIGHBOURS):
+    """Пересчитывает таблицу похожих рецептов целиком.
+
+    Совместная история идёт первой, недостающие места добирают похожие
+    по составу рецепты. Возвращает число сохранённых строк.
+    """
+    neighbours = {}
+    for recipe, scored in behaviour_neighbours(user_histories(), top_k):
+        neighbours[recipe] = scored
+    cold = [
+        pk for pk in Recipe.objects.values_list("pk", flat=True)
+        .iterator(chunk_size=CHUNK_SIZE)
+        if len(neighbours.get(pk, ())) < top_k
+    ]
+    for recipe, scored in content_neighbours(cold, top_k):
+        known = neighbours.setdefault(recipe, [])
+        taken = {other for _, other in known}
+        known.extend(
+            item for item in scored if item[1] not in taken
+        )
+        del known[top_k:]
+    rows = (
+        RecipeNeighbour(recipe_id=recipe, neighbour_id=other, score=score)
+        for recipe, scored in neighbours.items()
+        for score, other in scored
+    )
+    created = 0
+    with transaction.atomic():
+        RecipeNeighbour.objects.all().delete()
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                created += len(RecipeNeighbour.objects.bulk_create(batch))
+                batch = []
+        created += len(RecipeNeighbour.objects.bulk_create(batch))
+    return created
+
+
+def recommended_ids(user, limit, exclude=(), authors=()):
+    """Id рекомендованных пользователю рецептов по убыванию оценки.
+
+    Соседи последних рецептов из избранного и корзины складываются с
+    убывающим весом. Если их не хватает, добавляются популярные рецепты
+    авторов из подписок, затем просто популярные.
+    """
+    exclude = set(exclude)
+    scores = defaultdict(float)
+    if user.is_authenticated:
+        seeds = {}
+        for model in (Favourite, ShoppingCart):
+            recent = (
+                model.objects.filter(user=user).order_by("-id")
+                .values_list("recipe_id", flat=True)[:SEEDS]
+            )
+            for rank, recipe in enumerate(recent):
+                seeds[recipe] = max(seeds.get(recipe, 0), SEED_DECAY ** rank)
+        exclude.update(seeds)
+        for recipe, neighbour, score in RecipeNeighbour.objects.filter(
+            recipe__in=seeds
+        ).values_list("recipe_id", "neighbour_id", "score"):
+            if neighbour not in exclude:
+                scores[neighbour] += score * seeds[recipe]
+    chosen = heapq.nlargest(limit, scores, key=lambda pk: (scores[pk], pk))
+    fallbacks = [Recipe.objects.all()]
+    if authors:
+        fallbacks.insert(0, Recipe.objects.filter(author__in=authors))
+    for queryset in fallbacks:
+        if len(chosen) >= limit:
+            break
+        skip = exclude.union(chosen)
+        if user.is_authenticated:
+            queryset = queryset.exclude(author=user)
+        chosen.extend(
+            queryset.exclude(pk__in=skip)
+            .order_by("-favourites_count", "-id")
+            .values_list("pk", flat=True)[:limit - len(chosen)]
+        )
+    return chosen
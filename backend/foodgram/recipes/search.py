@@ -0,0 +1,223 @@
+import logging
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchHeadline, SearchQuery,
+                                            SearchRank, SearchVector)
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+
+from .models import IngredientsInRecipe, Recipe
+
+logger = logging.getLogger(__name__)
+
+CONFIGS = ("russian", "english")
+# Метки совпадений — управляющие символы ASCII: в тексте рецепта их нет,
+# и они переживают экранирование HTML. Django 3.2 кодирует параметры
+# SearchHeadline в latin-1, поэтому символы за её пределами не годятся.
+START_SEL = "\x02"
+STOP_SEL = "\x03"
+FTS_TABLE = "recipes_recipe_fts"
+FTS_FIELDS = ("name", "text", "ingredients", "tags")
+
+GIN_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS recipes_recipe_search_gin "
+    "ON recipes_recipe USING gin (search_vector)"
+)
+FTS_TABLE_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    f"{', '.join(FTS_FIELDS)}, tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+def create_search_index(sender, using, **kwargs):
+    """GIN-индекс по search_vector в PostgreSQL, таблица FTS5 в SQLite."""
+    connection = connections[using]
+    if connection.vendor == "postgresql":
+        sql = GIN_INDEX_SQL
+    elif connection.vendor == "sqlite":
+        sql = FTS_TABLE_SQL
+    else:
+        return
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute(sql)
+    except DatabaseError as error:
+        logger.warning("Не удалось создать поисковый индекс: %s", error)
+
+
+def related_names(queryset, field):
+    return Subquery(
+        queryset.filter(recipe=OuterRef("pk"))
+        .order_by()
+        .values("recipe")
+        .annotate(names=StringAgg(field, " "))
+        .values("names")
+    )
+
+
+def search_vector():
+    """Название, ингредиенты, теги и описание в русской и английской
+    конфигурациях с весами по убыванию важности.
+    """
+    sources = (
+        ("name", "A"),
+        (related_names(IngredientsInRecipe.objects, "ingredient__name"), "B"),
+        (related_names(Recipe.tags.through.objects, "tag__name"), "B"),
+        ("text", "C"),
+    )
+    vector = None
+    for source, weight in sources:
+        for config in CONFIGS:
+            part = SearchVector(source, config=config, weight=weight)
+            vector = part if vector is None else vector + part
+    return vector
+
+
+def search_query(value):
+    query = None
+    for config in CONFIGS:
+        part = SearchQuery(value, config=config, search_type="websearch")
+        query = part if query is None else query | part
+    return query
+
+
+def fts_query(value):
+    """Запрос FTS5: все слова по префиксу, спецсимволы не передаются."""
+    return " ".join(f'"{word}"*' for word in re.findall(r"\w+", value))
+
+
+def update_search_index(pks):
+    """Пересчитывает поисковый индекс рецептов pks."""
+    pks = list(pks)
+    if not pks:
+        return
+    if connection.vendor == "postgresql":
+        Recipe.objects.filter(pk__in=pks).update(
+            search_vector=search_vector()
+        )
+    elif connection.vendor == "sqlite":
+        update_fts(pks)
+
+
+def update_fts(pks):
+    documents = {
+        pk: {"name": name, "text": text, "ingredients": [], "tags": []}
+        for pk, name, text in Recipe.objects.filter(pk__in=pks)
+        .values_list("pk", "name", "text")
+    }
+    for recipe, name in IngredientsInRecipe.objects.filter(
+        recipe__in=documents
+    ).values_list("recipe_id", "ingredient__name"):
+        documents[recipe]["ingredients"].append(name)
+    for recipe, name in Recipe.tags.through.objects.filter(
+        recipe__in=documents
+    ).values_list("recipe_id", "tag__name"):
+        documents[recipe]["tags"].append(name)
+    placeholders = ", ".join(["%s"] * len(pks))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", pks
+        )
+        cursor.executemany(
+            f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_FIELDS)}) "
+            "VALUES (%s, %s, %s, %s, %s)",
+            [
+                (
+                    pk, document["name"], document["text"],
+                    " ".join(document["ingredients"]),
+                    " ".join(document["tags"]),
+                )
+                for pk, document in documents.items()
+            ],
+        )
+
+
+def schedule_search_update(pks):
+    pks = list(pks)
+    if pks:
+        transaction.on_commit(lambda: update_search_index(pks))
+
+
+def search_recipes(queryset, value):
+    """Рецепты под запрос value по убыванию релевантности."""
+    if connection.vendor == "postgresql":
+        query = search_query(value)
+        return (
+            queryset.filter(search_vector=query)
+            .annotate(rank=SearchRank("search_vector", query))
+            .order_by("-rank", "-id")
+        )
+    if connection.vendor == "sqlite":
+        match = fts_query(value)
+        if not match:
+            return queryset.none()
+        table = Recipe._meta.db_table
+        return (
+            queryset.filter(id__in=RawSQL(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s",
+                (match,),
+            ))
+            .annotate(rank=RawSQL(
+                f"SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s AND rowid = {table}.id",
+                (match,),
+            ))
+            .order_by("-rank", "-id")
+        )
+    return queryset.filter(name__icontains=value).order_by("-id")
+
+
+def mark_matches(fragment):
+    """Экранирует фрагмент и только потом превращает метки в <b>."""
+    return (
+        escape(fragment or "")
+        .replace(START_SEL, "<b>")
+        .replace(STOP_SEL, "</b>")
+    )
+
+
+def search_highlights(pks, value):
+    """Название и фрагмент описания с подсвеченными совпадениями.
+
+    Текст рецепта экранируется, в ответе остаются только теги <b>.
+    """
+    if not pks:
+        return {}
+    if connection.vendor == "postgresql":
+        query = search_query(value)
+        options = {
+            "config": CONFIGS[0],
+            "start_sel": START_SEL,
+            "stop_sel": STOP_SEL,
+        }
+        rows = Recipe.objects.filter(pk__in=pks).annotate(
+            name_highlight=SearchHeadline(
+                "name", query, highlight_all=True, **options
+            ),
+            text_highlight=SearchHeadline(
+                "text", query, max_words=35, min_words=15, **options
+            ),
+        ).values_list("pk", "name_highlight", "text_highlight")
+    elif connection.vendor == "sqlite":
+        match = fts_query(value)
+        if not match:
+            return {}
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, "
+                f"highlight({FTS_TABLE}, 0, %s, %s), "
+                f"snippet({FTS_TABLE}, 1, %s, %s, '…', 24) "
+                f"FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s "
+                f"AND rowid IN ({', '.join(['%s'] * len(pks))})",
+                [START_SEL, STOP_SEL, START_SEL, STOP_SEL, match, *pks],
+            )
+            rows = cursor.fetchall()
+    else:
+        return {}
+    return {
+        pk: {"name": mark_matches(name), "text": mark_matches(text)}
+        for pk, name, text in rows
+    }
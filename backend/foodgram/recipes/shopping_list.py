@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from .models import IngredientsInRecipe, ShoppingCart, ShoppingListItem, User
+
+BATCH_SIZE = 500
+
+
+def recipe_buyers(recipe_id):
+    """id пользователей с рецептом в корзине, годится и как подзапрос."""
+    return ShoppingCart.objects.filter(recipe=recipe_id).values_list(
+        "user_id", flat=True
+    )
+
+
+def recipe_amounts(recipe_ids, sign=1):
+    """{ингредиент: количество} в рецептах recipe_ids со знаком sign."""
+    return {
+        ingredient: sign * total
+        for ingredient, total in IngredientsInRecipe.objects.filter(
+            recipe__in=recipe_ids
+        )
+        .values("ingredient")
+        .annotate(total=Sum("amount"))
+        .order_by()
+        .values_list("ingredient", "total")
+    }
+
+
+def apply_deltas(user_ids, deltas):
+    """Прибавляет deltas {ингредиент: количество} к спискам пользователей.
+
+    Недостающие строки вставляются с нулём, затем все строки сдвигаются
+    одним UPDATE, а дошедшие до нуля удаляются. user_ids может быть
+    подзапросом.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    items = ShoppingListItem.objects.filter(
+        user__in=user_ids, ingredient__in=deltas
+    )
+    added = [pk for pk, delta in deltas.items() if delta > 0]
+    if added:
+        existing = set(
+            items.filter(ingredient__in=added)
+            .values_list("user_id", "ingredient_id")
+        )
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user, ingredient_id=ingredient, total_amount=0
+                )
+                for user in user_ids
+                for ingredient in added
+                if (user, ingredient) not in existing
+            ),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+    items.update(total_amount=Greatest(
+        F("total_amount") + Case(
+            *(When(ingredient=pk, then=Value(delta))
+              for pk, delta in deltas.items()),
+            output_field=IntegerField(),
+        ),
+        0,
+    ))
+    items.filter(total_amount=0).delete()
+
+
+def change_cart(user_id, recipe_ids, sign):
+    """Добавление (sign=1) или удаление (sign=-1) рецептов из корзины."""
+    apply_deltas([user_id], recipe_amounts(recipe_ids, sign))
+
+
+def change_recipe(recipe_id, deltas):
+    """Изменение ингредиентов рецепта у всех, у кого он в корзине."""
+    apply_deltas(recipe_buyers(recipe_id), deltas)
+
+
+def refresh_shopping_lists(user_ids):
+    """Пересобирает сводные списки покупок указанных пользователей.
+
+    Строки пользователей блокируются, чтобы параллельные пересчёты одного
+    списка не конфликтовали по уникальному ключу.
+    """
+    user_ids = sorted(set(user_ids))
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            list(
+                User.objects.select_for_update().filter(pk__in=batch)
+                .order_by("pk").values_list("pk", flat=True)
+            )
+            ShoppingListItem.objects.filter(user__in=batch).delete()
+            ShoppingListItem.objects.bulk_create(
+                ShoppingListItem(
+                    user_id=row["recipe__carts__user"],
+                    ingredient_id=row["ingredient"],
+                    total_amount=row["total_amount"],
+                )
+                for row in IngredientsInRecipe.objects.filter(
+                    recipe__carts__user__in=batch
+                )
+                .values("recipe__carts__user", "ingredient")
+                .annotate(total_amount=Sum("amount"))
+                .order_by()
+            )
@@ -0,0 +1,193 @@
+import logging
+
+from django.db import DatabaseError, connections, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .feed import remove_author, schedule_backfill, schedule_fan_out
+from .images import schedule_variants
+from .models import (Favourite, Ingredient, IngredientsInRecipe, Recipe,
+                     ShoppingCart, Subscription, Tag, User)
+from .search import schedule_search_update
+from .shopping_list import change_cart, change_recipe
+
+logger = logging.getLogger(__name__)
+
+TRIGRAM_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS recipes_ingredient_name_trgm "
+    "ON recipes_ingredient USING gin ((UPPER(name::text)) gin_trgm_ops)"
+)
+
+
+def create_trigram_index(sender, using, **kwargs):
+    """GIN-индекс pg_trgm под icontains/istartswith по названию ингредиента.
+
+    Миграции в репозитории не хранятся, поэтому расширение и индекс
+    создаются после migrate.
+    """
+    connection = connections[using]
+    if connection.vendor != "postgresql":
+        return
+    try:
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+            cursor.execute(TRIGRAM_INDEX_SQL)
+    except DatabaseError as error:
+        logger.warning("Не удалось создать триграммный индекс: %s", error)
+
+
+def update_counter(model, pk, field, delta):
+    """Сдвигает счётчик, не опуская его ниже нуля.
+
+    Счётчик может отставать от факта, пока не запущен recount.
+    """
+    model.objects.filter(pk=pk).update(
+        **{field: Greatest(F(field) + delta, 0)}
+    )
+
+
+@receiver(post_save, sender=Favourite)
+def favourite_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, "favourites_count", 1)
+
+
+@receiver(post_delete, sender=Favourite)
+def favourite_deleted(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, "favourites_count", -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(Recipe, instance.recipe_id, "carts_count", 1)
+        change_cart(instance.user_id, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    update_counter(Recipe, instance.recipe_id, "carts_count", -1)
+    change_cart(instance.user_id, [instance.recipe_id], -1)
+
+
+@receiver(pre_save, sender=IngredientsInRecipe)
+def ingredient_in_recipe_replaced(sender, instance, **kwargs):
+    """Одиночное изменение строки, например из админки: старое значение
+    вычитается здесь, новое прибавляется в post_save.
+    """
+    if instance.pk is None:
+        return
+    old = IngredientsInRecipe.objects.filter(pk=instance.pk).values_list(
+        "recipe_id", "ingredient_id", "amount"
+    ).first()
+    if old:
+        recipe, ingredient, amount = old
+        change_recipe(recipe, {ingredient: -amount})
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+def ingredient_in_recipe_saved(sender, instance, **kwargs):
+    change_recipe(
+        instance.recipe_id, {instance.ingredient_id: instance.amount}
+    )
+
+
+@receiver(post_delete, sender=IngredientsInRecipe)
+def ingredient_in_recipe_deleted(sender, instance, **kwargs):
+    """При удалении рецепта его строки и корзины удаляются в любом порядке;
+    оба обработчика читают то, что осталось в базе, и вычитают одно
+    количество ровно один раз.
+    """
+    change_recipe(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, "subscribers_count", 1)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, "subscribers_count", -1)
+
+
+@receiver(post_save, sender=Subscription)
+def subscription_feed_backfill(sender, instance, created, **kwargs):
+    if created:
+        schedule_backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def subscription_feed_cleanup(sender, instance, **kwargs):
+    remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_created(sender, instance, created, **kwargs):
+    if created:
+        update_counter(User, instance.author_id, "recipes_count", 1)
+        schedule_fan_out(instance.pk)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_image_changed(sender, instance, **kwargs):
+    if instance.image and (
+        instance.image.name != instance.image_variants.get("source")
+    ):
+        schedule_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    update_counter(User, instance.author_id, "recipes_count", -1)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_saved(sender, instance, update_fields, **kwargs):
+    if not update_fields or {"name", "text"} & set(update_fields):
+        schedule_search_update([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_deleted(sender, instance, **kwargs):
+    schedule_search_update([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_search_tags_changed(sender, instance, action, reverse, pk_set,
+                               **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        schedule_search_update(pk_set or [])
+    else:
+        schedule_search_update([instance.pk])
+
+
+@receiver(post_save, sender=IngredientsInRecipe)
+@receiver(post_delete, sender=IngredientsInRecipe)
+def recipe_search_ingredient_changed(sender, instance, **kwargs):
+    schedule_search_update([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_renamed(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_update(
+            IngredientsInRecipe.objects.filter(ingredient=instance)
+            .values_list("recipe_id", flat=True)
+        )
+
+
+@receiver(post_save, sender=Tag)
+def tag_search_renamed(sender, instance, created, **kwargs):
+    if not created:
+        schedule_search_update(
+            instance.recipes.values_list("id", flat=True)
+        )
@@ -0,0 +1,80 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.catalogue import catalogue
+from recipes.models import Recipe, Tag
+from recipes.search import (search_highlights, search_recipes,
+                            update_search_index)
+from users.models import CustomUser
+
+
+class SearchTests(TestCase):
+    """Поиск: FTS5 на SQLite, search_vector на PostgreSQL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = CustomUser.objects.create_user(
+            email="author@example.com", username="author",
+            first_name="author", last_name="author", password="pass12345!",
+        )
+        cls.tag = Tag.objects.create(name="Завтрак", color="#FFFFFF",
+                                     slug="breakfast")
+        cls.pancakes, cls.fritters, cls.borscht = (
+            Recipe.objects.create(author=author, name=name, text=text,
+                                  cooking_time=5)
+            for name, text in (
+                ("Блины <script>alert(1)</script>",
+                 "Тонкие блины <img src=x onerror=alert(1)> & мёд"),
+                ("Оладьи", "Пышнее, чем блины"),
+                ("Борщ", "Суп со свёклой"),
+            )
+        )
+        for recipe in (cls.pancakes, cls.fritters, cls.borscht):
+            recipe.tags.set([cls.tag])
+        update_search_index(
+            [cls.pancakes.pk, cls.fritters.pk, cls.borscht.pk]
+        )
+
+    def found(self, value):
+        return list(
+            search_recipes(Recipe.objects.all(), value)
+            .values_list("pk", flat=True)
+        )
+
+    def test_search_recipes(self):
+        self.assertCountEqual(
+            self.found("блины"), [self.pancakes.pk, self.fritters.pk]
+        )
+        self.assertEqual(self.found("свёклой"), [self.borscht.pk])
+        self.assertEqual(self.found("пельмени"), [])
+
+    def test_highlights_escape_html(self):
+        highlight = search_highlights([self.pancakes.pk], "блины")[
+            self.pancakes.pk
+        ]
+        self.assertEqual(
+            highlight["name"],
+            "<b>Блины</b> &lt;script&gt;alert(1)&lt;/script&gt;",
+        )
+        self.assertIn("<b>блины</b>", highlight["text"])
+        self.assertIn("&lt;img src=x onerror=alert(1)&gt;", highlight["text"])
+        self.assertIn("&amp;", highlight["text"])
+        self.assertNotIn("<img", highlight["text"])
+
+    def test_cursor_keeps_relevance_order(self):
+        cache.clear()
+        catalogue.invalidate()
+        expected = self.found("блины")
+        for query in ("", "&cursor="):
+            with self.subTest(query=query):
+                response = APIClient().get(
+                    f"/api/recipes/?tags={self.tag.slug}&q=блины{query}"
+                )
+                self.assertEqual(response.status_code, 200)
+                results = response.json()["results"]
+                self.assertEqual(
+                    [recipe["id"] for recipe in results], expected
+                )
+                self.assertTrue(all(recipe["highlight"]
+                                    for recipe in results))
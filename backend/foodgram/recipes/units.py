@@ -0,0 +1,90 @@
+from django.db.models import Case, CharField, F, FloatField, Value, When
+from django.db.models.functions import Lower, Trim
+
+TO_TASTE = "по вкусу"
+
+# Единица показа и её множитель к базовой (г, мл, шт.) по возрастанию.
+DIMENSIONS = {
+    "mass": (("мг", 0.001), ("г", 1), ("кг", 1000)),
+    "volume": (("мл", 1), ("л", 1000)),
+    "count": (("шт.", 1),),
+}
+
+UNITS = {
+    "мг": ("mass", 0.001),
+    "г": ("mass", 1),
+    "г.": ("mass", 1),
+    "гр": ("mass", 1),
+    "гр.": ("mass", 1),
+    "кг": ("mass", 1000),
+    "кг.": ("mass", 1000),
+    "мл": ("volume", 1),
+    "мл.": ("volume", 1),
+    "л": ("volume", 1000),
+    "л.": ("volume", 1000),
+    "капля": ("volume", 0.05),
+    "ч. л.": ("volume", 5),
+    "ч.л.": ("volume", 5),
+    "ст. л.": ("volume", 15),
+    "ст.л.": ("volume", 15),
+    "стакан": ("volume", 250),
+    "шт": ("count", 1),
+    "шт.": ("count", 1),
+    TO_TASTE: (TO_TASTE, 0),
+}
+
+
+def normalized_unit(field):
+    return Lower(Trim(field))
+
+
+def _case(field, values, output_field, default):
+    groups = {}
+    for unit, value in values.items():
+        groups.setdefault(value, []).append(unit)
+    return Case(
+        *(
+            When(**{f"{field}__in": units}, then=Value(value))
+            for value, units in groups.items()
+        ),
+        default=default,
+        output_field=output_field,
+    )
+
+
+def dimension_expression(field):
+    """Размерность нормализованной единицы из поля field.
+
+    Незнакомая единица сама себе размерность.
+    """
+    return _case(
+        field,
+        {unit: dimension for unit, (dimension, _) in UNITS.items()},
+        CharField(),
+        F(field),
+    )
+
+
+def factor_expression(field):
+    """Множитель нормализованной единицы к базовой единице размерности."""
+    return _case(
+        field,
+        {unit: factor for unit, (_, factor) in UNITS.items()},
+        FloatField(),
+        Value(1.0),
+    )
+
+
+def round_amount(value):
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+def best_unit(dimension, amount):
+    """Самая крупная единица, в которой количество не меньше единицы."""
+    units = DIMENSIONS[dimension]
+    name, factor = units[0]
+    for unit_name, unit_factor in units:
+        if amount >= unit_factor:
+            name, factor = unit_name, unit_factor
+    return name, round_amount(amount / factor)